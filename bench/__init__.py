@@ -0,0 +1,10 @@
+"""
+Python++ 基准测试
+合成 .code 语料 (corpus)、工具链各环节的微基准 (micro) 和结果比较 (compare)。
+
+用法 (在仓库根目录):
+    python -m bench run -o results.json        运行全部基准并保存 JSON
+    python -m bench run -k eval_expr --quick   只运行指定基准, 缩小规模
+    python -m bench compare baseline.json results.json
+    python -m bench corpus out_dir             写出合成语料
+"""
@@ -0,0 +1,54 @@
+"""python -m bench 命令行入口"""
+
+import sys
+import argparse
+
+from bench import corpus, micro, compare
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bench', description='Python++ 工具链基准测试')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='运行基准')
+    run_parser.add_argument('-o', '--output', help='结果 JSON 文件')
+    run_parser.add_argument('-k', '--only', action='append', choices=sorted(micro.BENCHMARKS),
+                            help='只运行指定基准, 可重复')
+    run_parser.add_argument('--quick', action='store_true', help='缩小规模和重复次数')
+    run_parser.add_argument('--baseline', help='运行后与基线 JSON 比较')
+    run_parser.add_argument('--threshold', type=float, default=0.10, help='回归阈值 (默认 0.10 即慢 10%%)')
+
+    compare_parser = commands.add_parser('compare', help='比较两份结果, 有回归时返回 1')
+    compare_parser.add_argument('baseline', help='基线 JSON 文件')
+    compare_parser.add_argument('current', help='当前结果 JSON 文件')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='回归阈值 (默认 0.10 即慢 10%%)')
+
+    corpus_parser = commands.add_parser('corpus', help='写出合成 .code 语料')
+    corpus_parser.add_argument('output_dir', help='输出目录')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        results = micro.run(args.only, args.quick)
+        if args.output:
+            compare.save(results, args.output)
+            print(f"结果已保存: {args.output}")
+        if args.baseline:
+            rows = compare.compare(compare.load(args.baseline), results, args.threshold)
+            return 1 if compare.report(rows) else 0
+        return 0
+
+    if args.command == 'compare':
+        rows = compare.compare(compare.load(args.baseline), compare.load(args.current), args.threshold)
+        return 1 if compare.report(rows) else 0
+
+    if args.command == 'corpus':
+        for path in corpus.write_all(args.output_dir):
+            print(path)
+        return 0
+
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+基准结果比较
+按基准名对比两份 JSON 结果的 seconds (越小越好), 超过阈值的变慢记为回归。
+"""
+
+import json
+
+from bench.micro import format_seconds
+
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(baseline, current, threshold=0.10):
+    """返回 [(基准名, 基线耗时, 当前耗时, 比值, 状态)]; 状态为 ok/regression/improved/new/missing/skipped"""
+    base_results = baseline.get('benchmarks', {})
+    current_results = current.get('benchmarks', {})
+    rows = []
+    for name in sorted(set(base_results) | set(current_results)):
+        base = base_results.get(name, {}).get('seconds')
+        now = current_results.get(name, {}).get('seconds')
+        if name not in current_results:
+            rows.append((name, base, None, None, 'missing'))
+        elif now is None:
+            rows.append((name, base, None, None, 'skipped'))
+        elif base is None:
+            rows.append((name, None, now, None, 'new'))
+        else:
+            ratio = now / base
+            if ratio > 1 + threshold:
+                status = 'regression'
+            elif ratio < 1 - threshold:
+                status = 'improved'
+            else:
+                status = 'ok'
+            rows.append((name, base, now, ratio, status))
+    return rows
+
+
+def report(rows, log=print):
+    """打印比较表, 返回回归的基准数"""
+    log(f"{'benchmark':<22} {'baseline':>12} {'current':>12} {'ratio':>7}  status")
+    for name, base, now, ratio, status in rows:
+        base_text = format_seconds(base) if base is not None else '-'
+        now_text = format_seconds(now) if now is not None else '-'
+        ratio_text = f"{ratio:.2f}x" if ratio is not None else '-'
+        log(f"{name:<22} {base_text:>12} {now_text:>12} {ratio_text:>7}  {status}")
+    regressions = sum(1 for row in rows if row[4] == 'regression')
+    if regressions:
+        log(f"\n{regressions} 个基准变慢超过阈值")
+    return regressions
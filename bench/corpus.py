@@ -0,0 +1,103 @@
+"""
+合成 .code 语料
+按规模和语句组成生成可重复的 .code 源码, 供解析、转换、解释执行等基准使用。
+"""
+
+import os
+
+# 预设规模 (行数)
+SIZES = {
+    'small': 200,
+    'medium': 5000,
+    'large': 50000,
+}
+
+
+def gui_lines(line_count):
+    """转换器方言: 窗口、控件、属性、布局、事件和处理函数"""
+    yield 'window main "Bench App" 800 600\n'
+    i = 0
+    while i < line_count:
+        yield f'label lbl{i} "Label {i}" width=20\n'
+        yield f'button btn{i} "Button {i}" bg=#ffeedd\n'
+        yield f'lbl{i}.fg = "blue"\n'
+        yield f'lbl{i}.bg = "white"\n'
+        yield f'pack lbl{i} side=top pady=2\n'
+        yield f'pack btn{i} side=top\n'
+        yield f'function on_click{i}\n'
+        yield f'    for n in range(10)\n'
+        yield f'        lbl{i}.text = str(n)\n'
+        yield f'bind btn{i} click on_click{i}\n'
+        i += 10
+
+
+def script_lines(line_count):
+    """解释器方言: let/print/自增/单行 if/for/函数, 不涉及 GUI 和 pygame"""
+    yield 'let total = 0\n'
+    yield 'fn double(a) = a * 2\n'
+    i = 0
+    while i < line_count:
+        yield f'let x{i % 50} = {i} + 1\n'
+        yield 'total++\n'
+        yield f'if total > {i} then print total\n'
+        yield f'do y = double(x{i % 50})\n'
+        yield 'for k:5:total++\n'
+        yield '# 注释行\n'
+        yield f'print "line {i}"\n'
+        i += 7
+
+
+def windows_lines(line_count):
+    """多窗口程序: 主窗口中每个按钮用 show 打开一个带若干控件的子窗口"""
+    yield 'window main "Bench App" 800 600\n'
+    i = 0
+    while i < line_count:
+        yield f'window win{i} "Window {i}" 400 300\n'
+        for j in range(8):
+            yield f'label w{i}_lbl{j} "Field {j}" parent=win{i}\n'
+            yield f'pack w{i}_lbl{j} side=top\n'
+        yield f'button open{i} "Open {i}"\n'
+        yield f'pack open{i}\n'
+        yield f'function on_open{i}\n'
+        yield f'    show win{i}\n'
+        yield f'bind open{i} click on_open{i}\n'
+        i += 22
+
+
+def mixed_lines(line_count):
+    """GUI 与脚本语句交错"""
+    gui = gui_lines(line_count // 2)
+    script = script_lines(line_count - line_count // 2)
+    for pair in zip(gui, script):
+        yield from pair
+
+
+MIXES = {
+    'gui': gui_lines,
+    'script': script_lines,
+    'mixed': mixed_lines,
+    'windows': windows_lines,
+}
+
+
+def generate(size='medium', mix='gui'):
+    """返回语料行列表; size 可以是 SIZES 中的名称或行数"""
+    line_count = SIZES[size] if isinstance(size, str) else int(size)
+    return list(MIXES[mix](line_count))
+
+
+def write(path, size='medium', mix='gui'):
+    """把语料写入文件, 返回文件路径"""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(generate(size, mix))
+    return path
+
+
+def write_all(output_dir, sizes=SIZES, mixes=MIXES):
+    """为每种规模和组成写出一个 {mix}_{size}.code 文件, 返回文件路径列表"""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for mix in mixes:
+        for size in sizes:
+            paths.append(write(os.path.join(output_dir, f'{mix}_{size}.code'), size, mix))
+    return paths
@@ -0,0 +1,320 @@
+"""
+工具链微基准
+每个基准函数接收规模参数 quick, 返回 {'seconds': 每次操作的最短耗时, ...附加指标};
+依赖缺失时抛出 Skip, 由 run() 记录为跳过。
+"""
+
+import io
+import os
+import sys
+import time
+import timeit
+import platform
+import tempfile
+import subprocess
+import contextlib
+
+from bench import corpus
+
+# 仓库根目录, 被测模块 (interpreter、code_to_py 等) 从这里导入
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+BENCHMARKS = {}
+
+
+class Skip(Exception):
+    """基准依赖的模块或环境不可用"""
+
+
+def benchmark(name):
+    """注册基准函数"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def best_of(func, number, repeat):
+    """与 timeit 相同 (测量期间关闭 GC), 返回每次调用的最短耗时和中位数"""
+    times = sorted(t / number for t in timeit.repeat(func, number=number, repeat=repeat))
+    return times[0], times[len(times) // 2]
+
+
+def _import_interpreter():
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import interpreter
+    except ImportError as e:
+        raise Skip(f"无法导入 interpreter: {e}")
+    return interpreter
+
+
+def _quiet_interpreter():
+    """创建解释器实例; 返回的上下文管理器在执行期间丢弃 print 输出"""
+    interpreter = _import_interpreter()
+    return interpreter.PythonPPInterpreter(), contextlib.redirect_stdout(io.StringIO())
+
+
+@benchmark('interpreter_dispatch')
+def bench_interpreter_dispatch(quick=False):
+    """run_line 逐行分派: 脚本方言语料每行的平均耗时"""
+    lines = corpus.generate(200 if quick else 2000, 'script')
+
+    def run():
+        interp, quiet = _quiet_interpreter()
+        with quiet:
+            for line in lines:
+                interp.run_line(line)
+
+    best, median = best_of(run, 1, 3 if quick else 5)
+    return {'seconds': best / len(lines), 'median': median / len(lines), 'lines': len(lines)}
+
+
+@benchmark('eval_expr')
+def bench_eval_expr(quick=False):
+    """eval_expr: 在有 50 个变量的环境中求值一个算术表达式"""
+    interp, quiet = _quiet_interpreter()
+    with quiet:
+        for i in range(50):
+            interp.run_line(f'let v{i} = {i}')
+    expr = 'v1 + v2 * v3 - v49 // 7'
+    number = 200 if quick else 2000
+    best, median = best_of(lambda: interp.eval_expr(expr), number, 5)
+    return {'seconds': best, 'median': median, 'variables': 50}
+
+
+@benchmark('interpreter_loop')
+def bench_interpreter_loop(quick=False):
+    """for/repeat 单行循环: 每次迭代的耗时"""
+    iterations = 1000 if quick else 10000
+    interp, quiet = _quiet_interpreter()
+    with quiet:
+        interp.run_line('let total = 0')
+
+    def run():
+        with quiet:
+            interp.run_line(f'for k:{iterations}:total++')
+            interp.run_line(f'repeat {iterations}:total--')
+
+    best, median = best_of(run, 1, 5)
+    return {'seconds': best / (iterations * 2), 'median': median / (iterations * 2),
+            'iterations': iterations * 2}
+
+
+@benchmark('interpreter_call')
+def bench_interpreter_call(quick=False):
+    """用户函数调用: fn 定义的函数经 do 语句调用的耗时"""
+    iterations = 500 if quick else 5000
+    interp, quiet = _quiet_interpreter()
+    with quiet:
+        interp.run_line('let total = 0')
+        interp.run_line('fn inc(a) = a + 1')
+
+    def run():
+        with quiet:
+            interp.run_line(f'repeat {iterations}:do total = inc(total)')
+
+    best, median = best_of(run, 1, 5)
+    return {'seconds': best / iterations, 'median': median / iterations, 'iterations': iterations}
+
+
+@benchmark('parse')
+def bench_parse(quick=False):
+    """code_parser 词法+语法分析吞吐量"""
+    import code_parser
+    lines = corpus.generate('medium' if quick else 'large', 'gui')
+
+    def run():
+        for _ in code_parser.iter_parse(lines):
+            pass
+
+    best, median = best_of(run, 1, 3)
+    return {'seconds': best, 'median': median, 'lines': len(lines), 'lines_per_second': len(lines) / best}
+
+
+class _NullWriter:
+    def write(self, text):
+        pass
+
+
+@benchmark('convert')
+def bench_convert(quick=False):
+    """code_to_py 流式转换吞吐量 (输出丢弃, 不含磁盘写入)"""
+    import code_to_py
+    lines = corpus.generate('medium' if quick else 'large', 'gui')
+
+    def run():
+        code_to_py.CodeToPythonConverter().convert_stream(lines, _NullWriter())
+
+    best, median = best_of(run, 1, 3)
+    return {'seconds': best, 'median': median, 'lines': len(lines), 'lines_per_second': len(lines) / best}
+
+
+# 以非 __main__ 名称运行生成的程序: 执行导入和顶层定义, 但不进入 main() 和 Tk 主循环
+_STARTUP_SNIPPET = "import runpy, sys; runpy.run_path(sys.argv[1], run_name='bench_startup')"
+
+
+def _spawn_time(args, repeat, env=None):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(args, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[0], times[len(times) // 2]
+
+
+def _startup(quick, compile_options=None):
+    """转换合成程序并测量新进程中运行它 (编译模式下运行同目录的 .pyc) 的耗时"""
+    import code_to_py
+    repeat = 3 if quick else 10
+    with tempfile.TemporaryDirectory(prefix='bench_startup_') as temp_dir:
+        code_file = corpus.write(os.path.join(temp_dir, 'app.code'), 'medium', 'gui')
+        py_file = os.path.join(temp_dir, 'app.py')
+        with contextlib.redirect_stdout(io.StringIO()):
+            if not code_to_py.convert_file(code_file, py_file, compile_options):
+                raise RuntimeError("转换基准程序失败")
+        target = code_to_py.pyc_path(py_file, sibling=True) if compile_options else py_file
+        # 预热一次, 使运行时模块的字节码缓存就绪
+        _spawn_time([sys.executable, '-c', _STARTUP_SNIPPET, target], 1)
+        best, median = _spawn_time([sys.executable, '-c', _STARTUP_SNIPPET, target], repeat)
+        baseline, _ = _spawn_time([sys.executable, '-c', 'pass'], repeat)
+    return {'seconds': best, 'median': median, 'interpreter': baseline}
+
+
+@benchmark('app_startup')
+def bench_app_startup(quick=False):
+    """生成程序的冷启动: 新进程中导入运行时并编译执行生成的模块; interpreter 为空进程基线"""
+    return _startup(quick)
+
+
+@benchmark('app_startup_pyc')
+def bench_app_startup_pyc(quick=False):
+    """同 app_startup, 但转换时预编译 (code_to_py -c --pyc-sibling), 启动时直接加载 .pyc"""
+    return _startup(quick, {'optimize': 0, 'mode': 'unchecked-hash', 'sibling': True})
+
+
+@benchmark('gui_startup_lazy')
+def bench_gui_startup_lazy(quick=False):
+    """多窗口程序运行到首次绘制完成的耗时 (PYPP_STARTUP_PROBE); eager 为把 show 去掉、所有窗口立即创建的同一程序"""
+    import code_runtime
+    import code_to_py
+    probe = subprocess.run([sys.executable, '-c', 'import tkinter; tkinter.Tk().destroy()'],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if probe.returncode != 0:
+        raise Skip("Tk 不可用 (没有显示器?)")
+    repeat = 3 if quick else 10
+    lines = corpus.generate('small' if quick else 'medium', 'windows')
+    env = dict(os.environ, **{code_runtime.STARTUP_PROBE_VAR: '1'})
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='bench_lazy_') as temp_dir:
+        for variant in ('lazy', 'eager'):
+            code_file = os.path.join(temp_dir, f'{variant}.code')
+            with open(code_file, 'w', encoding='utf-8') as f:
+                for line in lines:
+                    f.write('    pass\n' if variant == 'eager' and line.startswith('    show ') else line)
+            py_file = os.path.join(temp_dir, f'{variant}.py')
+            with contextlib.redirect_stdout(io.StringIO()):
+                if not code_to_py.convert_file(code_file, py_file):
+                    raise RuntimeError("转换基准程序失败")
+            _spawn_time([sys.executable, py_file], 1, env)
+            results[variant] = _spawn_time([sys.executable, py_file], repeat, env)
+    best, median = results['lazy']
+    return {'seconds': best, 'median': median, 'eager': results['eager'][0]}
+
+
+def _import_cmd():
+    """按路径加载仓库中的 cmd.py (标准库也有 cmd 模块, 可能已被 pdb 等导入)"""
+    import importlib.util
+    spec = importlib.util.spec_from_file_location('pypp_cmd', os.path.join(ROOT, 'cmd.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@benchmark('cmd_session')
+def bench_cmd_session(quick=False):
+    """cmd.Session 中执行一条短命令的耗时; run 为每次启动 shell 的 cmd.run, pool 为 4 个会话并发时每条命令的耗时"""
+    if os.name != 'posix':
+        raise Skip("Session 需要 POSIX shell")
+    cmd = _import_cmd()
+    number = 100 if quick else 1000
+    with cmd.Session() as session:
+        session.output('true')
+        best, median = best_of(lambda: session.output('echo hello'), number, 3)
+    run_best, _ = best_of(lambda: cmd.run('echo hello'), max(1, number // 10), 3)
+    commands = ['echo hello'] * number
+    with cmd.SessionPool(4) as pool:
+        pool.run_many(commands[:4])
+        pool_best, _ = best_of(lambda: pool.run_many(commands), 1, 3)
+    return {'seconds': best, 'median': median, 'run': run_best, 'pool': pool_best / number,
+            'speedup': run_best / best}
+
+
+@benchmark('gameplus_frame')
+def bench_gameplus_frame(quick=False):
+    """gameplus 单帧耗时: 清屏、绘制矩形/圆/文字并刷新, 使用 SDL dummy 驱动无头运行"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            import gameplus
+    except ImportError as e:
+        raise Skip(f"无法导入 gameplus: {e}")
+    gameplus.init(640, 480, 'bench')
+    frames = 30 if quick else 300
+
+    def frame():
+        gameplus.clear('black')
+        for i in range(50):
+            gameplus.rect(i * 12, i * 8, 20, 20, 'red')
+        for i in range(20):
+            gameplus.circle(i * 30, 240, 10, (0, 128, 255))
+        for i in range(5):
+            gameplus.text(f'score {i}', 10, i * 30, 24, 'white')
+        gameplus.update(fps=0)
+
+    try:
+        best, median = best_of(frame, frames, 3)
+    finally:
+        gameplus.pygame.quit()
+    return {'seconds': best, 'median': median, 'fps': 1 / best}
+
+
+def run(names=None, quick=False, log=print):
+    """运行选中的基准 (默认全部), 返回可写成 JSON 的结果"""
+    results = {}
+    for name, func in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        log(f"{name} ...")
+        start = time.perf_counter()
+        try:
+            result = func(quick)
+        except Skip as e:
+            results[name] = {'skipped': str(e)}
+            log(f"  跳过: {e}")
+            continue
+        result['wall'] = time.perf_counter() - start
+        results[name] = result
+        log(f"  {format_seconds(result['seconds'])}")
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'quick': quick,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'benchmarks': results,
+    }
+
+
+def format_seconds(seconds):
+    """按量级显示耗时"""
+    for unit, scale in (('s', 1), ('ms', 1e3), ('us', 1e6)):
+        if seconds * scale >= 1:
+            return f"{seconds * scale:.3f} {unit}"
+    return f"{seconds * 1e9:.1f} ns"
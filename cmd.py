@@ -1,5 +1,43 @@
 import subprocess
 import os
+import sys
+import errno
+import signal
+import time
+import threading
+from collections import namedtuple
+
+# asyncio、concurrent.futures、hashlib、shutil 等只在用到它们的函数中导入,
+# 只调用 run/output 的程序不必为此付出导入时间
+
+# run_many 中每条命令的结果; 超时或无法启动时 returncode 为 -1, error 为原因
+Result = namedtuple('Result', 'cmd returncode output error seconds')
+# pipeline 中 Python 过滤阶段每次读取的字节数
+CHUNK_SIZE = 64 * 1024
+# copy_tree 等批量文件操作中每个文件的结果; path 为相对于树根的路径,
+# value 为复制的字节数 (copy_tree) 或摘要 (hash_tree), error 为失败原因
+FileResult = namedtuple('FileResult', 'path ok value error')
+# 内核复制不可用 (跨文件系统、文件系统或内核不支持) 时的错误码, 遇到时换用下一种复制方式
+_FAST_COPY_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP,
+                          errno.EBADF, errno.EPERM, errno.ETXTBSY}
+
+# 字符串命令经 shell 执行, 列表命令 (如 ['git', 'status']) 直接执行, 不启动 shell
+def _popen_args(cmd):
+    args = {'shell': isinstance(cmd, str)}
+    if os.name == 'posix':
+        # 独立的进程组: 超时或提前结束时连同 shell 启动的子进程一起结束
+        args['start_new_session'] = True
+    return args
+
+def _kill(proc):
+    """结束进程 (及其进程组)"""
+    try:
+        if os.name == 'posix':
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
 
 def run(cmd):
     """运行命令并返回(返回码,输出)"""
@@ -34,4 +72,571 @@ def mkdir(path):
         os.makedirs(path, exist_ok=True)
         return True
     except Exception:
-        return False 
\ No newline at end of file
+        return False 
+
+def stream(cmd, stderr=True, cwd=None):
+    """逐行产生命令的输出 (不含换行符), 命令结束时生成器的返回值为返回码
+
+    输出到达即产生, 不在内存中缓存全部输出; stderr 为 True 时合并标准错误。
+    提前结束迭代 (break 或 close) 时结束命令。
+    """
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT if stderr else None,
+                            stdin=subprocess.DEVNULL, cwd=cwd, text=True, errors='replace', bufsize=1,
+                            **_popen_args(cmd))
+    try:
+        for line in proc.stdout:
+            yield line.rstrip('\n')
+        return proc.wait()
+    finally:
+        if proc.poll() is None:
+            _kill(proc)
+        proc.stdout.close()
+        proc.wait()
+
+def _run_captured(cmd, timeout=None, cwd=None):
+    """运行命令并收集输出, 返回 Result; 超时时结束整个进程组"""
+    start_time = time.perf_counter()
+    try:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+                                cwd=cwd, text=True, errors='replace', **_popen_args(cmd))
+    except Exception as e:
+        return Result(cmd, -1, '', str(e), time.perf_counter() - start_time)
+    try:
+        out, err = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill(proc)
+        out, err = proc.communicate()
+        return Result(cmd, -1, out.strip(), f"超时 ({timeout}s)", time.perf_counter() - start_time)
+    return Result(cmd, proc.returncode, out.strip(), err.strip(), time.perf_counter() - start_time)
+
+def run_many(cmds, jobs=None, timeout=None, cwd=None):
+    """用最多 jobs 个并发进程 (默认 CPU 核数) 运行一组命令, 按输入顺序返回 Result 列表
+
+    timeout 是每条命令各自的超时 (秒), 一条命令超时不影响其它命令。
+    """
+    cmds = list(cmds)
+    if not cmds:
+        return []
+    from concurrent.futures import ThreadPoolExecutor
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(cmds)))
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(lambda cmd: _run_captured(cmd, timeout, cwd), cmds))
+
+async def _create_process(cmd, stdout, stderr, cwd):
+    import asyncio
+    args = _popen_args(cmd)
+    if args.pop('shell'):
+        return await asyncio.create_subprocess_shell(cmd, stdout=stdout, stderr=stderr,
+                                                     stdin=subprocess.DEVNULL, cwd=cwd, **args)
+    return await asyncio.create_subprocess_exec(*cmd, stdout=stdout, stderr=stderr,
+                                                stdin=subprocess.DEVNULL, cwd=cwd, **args)
+
+async def run_async(cmd, timeout=None, cwd=None):
+    """run 的 asyncio 版本: 返回(返回码,输出); 超时返回 (-1, "超时")"""
+    import asyncio
+    try:
+        proc = await _create_process(cmd, subprocess.PIPE, subprocess.PIPE, cwd)
+    except Exception as e:
+        return -1, str(e)
+    try:
+        out, _ = await asyncio.wait_for(proc.communicate(), timeout)
+    except asyncio.TimeoutError:
+        _kill(proc)
+        await proc.wait()
+        return -1, f"超时 ({timeout}s)"
+    return proc.returncode, out.decode(errors='replace').strip()
+
+async def stream_async(cmd, stderr=True, cwd=None):
+    """stream 的 asyncio 版本: 异步逐行产生输出 (async for line in cmd.stream_async(...))"""
+    proc = await _create_process(cmd, subprocess.PIPE, subprocess.STDOUT if stderr else None, cwd)
+    try:
+        async for line in proc.stdout:
+            yield line.decode(errors='replace').rstrip('\n')
+        await proc.wait()
+    finally:
+        if proc.returncode is None:
+            _kill(proc)
+            await proc.wait()
+
+class PipelineResult(namedtuple('PipelineResult', 'returncodes output errors')):
+    """pipeline 的结果: 各阶段的返回码、最后一个阶段的输出 (写入文件时为 None) 和 {阶段序号: 错误信息}"""
+    __slots__ = ()
+
+    @property
+    def returncode(self):
+        """最后一个失败阶段的返回码 (同 shell 的 pipefail), 全部成功时为 0"""
+        return next((code for code in reversed(self.returncodes) if code != 0), 0)
+
+def line_filter(func):
+    """把逐行处理函数 func(行) -> 新行或 None (丢弃该行) 包装为 pipeline 的过滤阶段; 行为 bytes, 含换行符"""
+    def stage(chunks):
+        pending = b''
+        for chunk in chunks:
+            lines = (pending + chunk).splitlines(keepends=True)
+            pending = lines.pop() if lines and not lines[-1].endswith(b'\n') else b''
+            out = [line for line in map(func, lines) if line is not None]
+            if out:
+                yield b''.join(out)
+        if pending:
+            line = func(pending)
+            if line is not None:
+                yield line
+    return stage
+
+def _run_filter(func, source, sink, close_sink, index, errors, chunk_size):
+    """在线程中运行过滤阶段: 从 source 分块读取, 把 func 产生的块写入 sink"""
+    try:
+        for chunk in func(iter(lambda: source.read1(chunk_size), b'')):
+            sink.write(chunk)
+        sink.flush()
+    except BrokenPipeError:
+        # 下游已结束 (如 head), 与 shell 中收到 SIGPIPE 的命令一样停止
+        pass
+    except Exception as e:
+        errors[index] = f"{type(e).__name__}: {e}"
+    finally:
+        source.close()
+        if close_sink:
+            try:
+                sink.close()
+            except BrokenPipeError:
+                pass
+
+def _feed(data, sink):
+    try:
+        sink.write(data)
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            sink.close()
+        except BrokenPipeError:
+            pass
+
+def pipeline(stages, input=None, output=None, cwd=None, text=True, chunk_size=CHUNK_SIZE):
+    """不经过 shell 运行管道 a | b | c, 返回 PipelineResult
+
+    每个阶段是参数列表 (['grep', 'ERROR'])、按 shell 规则拆分的字符串 ("sort -u", 不支持管道和重定向)
+    或 Python 过滤函数 func(块迭代器) -> 产生 bytes 块 (见 line_filter)。
+    相邻命令之间直接用 OS 管道连接, 数据不经过 Python; 过滤阶段在线程中逐块处理。
+    input 为 bytes (写入第一个阶段) 或文件路径; output 为文件路径或已打开的二进制文件时最后一个阶段直接写入,
+    否则收集最后一个阶段的输出 (text 为 True 时解码为字符串)。各阶段的标准错误不重定向。
+    """
+    import shlex
+    stages = list(stages)
+    returncodes = [0] * len(stages)
+    errors = {}
+    procs = []
+    threads = []
+    close_output = isinstance(output, str)
+    output_file = open(output, 'wb') if close_output else output
+    # upstream: 下一个阶段的输入 (二进制文件对象), None 表示空输入
+    upstream = None
+    try:
+        if isinstance(input, (bytes, bytearray)):
+            read_fd, write_fd = os.pipe()
+            upstream = os.fdopen(read_fd, 'rb')
+            feeder = threading.Thread(target=_feed, args=(input, os.fdopen(write_fd, 'wb')), daemon=True)
+            feeder.start()
+            threads.append(feeder)
+        elif input is not None:
+            upstream = open(input, 'rb')
+
+        for index, stage in enumerate(stages):
+            last = index == len(stages) - 1
+            if callable(stage):
+                if last and output_file is not None:
+                    sink, close_sink, downstream = output_file, False, None
+                else:
+                    read_fd, write_fd = os.pipe()
+                    sink, close_sink, downstream = os.fdopen(write_fd, 'wb'), True, os.fdopen(read_fd, 'rb')
+                source = upstream if upstream is not None else open(os.devnull, 'rb')
+                thread = threading.Thread(target=_run_filter, daemon=True,
+                                          args=(stage, source, sink, close_sink, index, errors, chunk_size))
+                thread.start()
+                threads.append(thread)
+                procs.append((index, None))
+                upstream = downstream
+                continue
+
+            args = shlex.split(stage) if isinstance(stage, str) else list(stage)
+            stdout = output_file if last and output_file is not None else subprocess.PIPE
+            try:
+                proc = subprocess.Popen(args, stdin=upstream if upstream is not None else subprocess.DEVNULL,
+                                        stdout=stdout, cwd=cwd)
+            except Exception as e:
+                # 与 shell 相同: 无法启动的阶段记为失败, 下游读到空输入
+                returncodes[index] = -1
+                errors[index] = str(e)
+                proc = None
+            finally:
+                # 子进程已持有管道的读端, 关闭本进程的副本, 上游才能在下游退出时收到 SIGPIPE
+                if upstream is not None:
+                    upstream.close()
+            procs.append((index, proc))
+            upstream = proc.stdout if proc is not None else None
+
+        collected = upstream.read() if upstream is not None else None
+    finally:
+        if upstream is not None:
+            upstream.close()
+        for index, proc in procs:
+            if proc is not None:
+                returncodes[index] = proc.wait()
+        for thread in threads:
+            thread.join()
+        if close_output:
+            output_file.close()
+    for index in errors:
+        if procs[index][1] is None and returncodes[index] == 0:
+            returncodes[index] = 1
+    if output_file is not None:
+        collected = None
+    elif collected is None:
+        collected = b''
+    if collected is not None and text:
+        collected = collected.decode(errors='replace')
+    return PipelineResult(returncodes, collected, errors)
+
+def _scan_tree(root):
+    """用 os.scandir 遍历目录树 (不跟随符号链接), 返回 (目录列表, 文件列表) 的相对路径; 父目录总在子目录之前"""
+    dirs, files = [], []
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(os.path.join(root, rel_dir)) as entries:
+            for entry in entries:
+                rel_path = os.path.join(rel_dir, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(rel_path)
+                    stack.append(rel_path)
+                else:
+                    files.append(rel_path)
+    return dirs, files
+
+def _match(rel_path, pattern):
+    """pattern 含路径分隔符时匹配整个相对路径, 否则只匹配文件名"""
+    if pattern is None:
+        return True
+    import fnmatch
+    if '/' in pattern:
+        return fnmatch.fnmatch(rel_path.replace(os.sep, '/'), pattern)
+    return fnmatch.fnmatch(os.path.basename(rel_path), pattern)
+
+def _for_each_file(func, paths, jobs):
+    """在线程池中对每个相对路径调用 func(相对路径) -> value, 返回按路径排序的 FileResult 列表"""
+    def call(rel_path):
+        try:
+            return FileResult(rel_path, True, func(rel_path), None)
+        except Exception as e:
+            return FileResult(rel_path, False, None, str(e))
+    paths = sorted(paths)
+    if not paths:
+        return []
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=jobs or min(32, (os.cpu_count() or 1) + 4)) as pool:
+        return list(pool.map(call, paths))
+
+def _copy_file_range(src_fd, dst_fd, offset, count):
+    return os.copy_file_range(src_fd, dst_fd, count, offset)
+
+def _sendfile(src_fd, dst_fd, offset, count):
+    return os.sendfile(dst_fd, src_fd, offset, count)
+
+# Linux 上在内核中复制数据的方式, 依次尝试: copy_file_range (同一文件系统上可能直接共享数据块), sendfile
+_FAST_COPIES = [copy for name, copy in (('copy_file_range', _copy_file_range), ('sendfile', _sendfile))
+                if hasattr(os, name) and sys.platform.startswith('linux')]
+
+def _fast_copy(src_fd, dst_fd, size):
+    """在内核中复制整个文件, 返回复制的字节数; 都不可用时返回 None"""
+    block = min(max(size, 8 * 1024 * 1024), 1024 ** 3)
+    for copy in _FAST_COPIES:
+        offset = 0
+        try:
+            while True:
+                sent = copy(src_fd, dst_fd, offset, block)
+                if sent == 0:
+                    return offset
+                offset += sent
+        except OSError as e:
+            if offset == 0 and e.errno in _FAST_COPY_UNSUPPORTED:
+                continue
+            raise
+    return None
+
+def copy_file(src, dst):
+    """复制一个文件 (包括权限和修改时间), 符号链接复制为链接本身; 返回复制的字节数"""
+    import shutil
+    if os.path.islink(src):
+        if os.path.lexists(dst):
+            os.remove(dst)
+        os.symlink(os.readlink(src), dst)
+        return 0
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        copied = _fast_copy(fsrc.fileno(), fdst.fileno(), size)
+        if copied is None:
+            shutil.copyfileobj(fsrc, fdst, CHUNK_SIZE * 16)
+            copied = fdst.tell()
+    shutil.copystat(src, dst)
+    return copied
+
+def glob(root, pattern='*'):
+    """root 下 (递归) 匹配 pattern 的全部文件, 返回排序后的路径列表; 如 glob('logs', '*.log')、glob('src', 'a/*/b.py')"""
+    _, files = _scan_tree(root)
+    return sorted(os.path.join(root, rel_path) for rel_path in files if _match(rel_path, pattern))
+
+def copy_tree(src, dst, pattern=None, jobs=None):
+    """把目录树 src 复制到 dst (合并到已有目录, 覆盖同名文件), 返回每个文件的 FileResult
+
+    给出 pattern 时只复制匹配的文件。文件在线程池中并行复制, Linux 上由内核直接复制数据。
+    """
+    dirs, files = _scan_tree(src)
+    files = [rel_path for rel_path in files if _match(rel_path, pattern)]
+    if pattern is not None:
+        dirs = sorted({os.path.dirname(rel_path) for rel_path in files} - {''})
+    os.makedirs(dst, exist_ok=True)
+    for rel_dir in dirs:
+        os.makedirs(os.path.join(dst, rel_dir), exist_ok=True)
+    return _for_each_file(lambda rel_path: copy_file(os.path.join(src, rel_path), os.path.join(dst, rel_path)),
+                          files, jobs)
+
+def _move_file(src, dst):
+    try:
+        os.replace(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        copy_file(src, dst)
+        os.remove(src)
+
+def move_tree(src, dst, jobs=None):
+    """把目录树 src 移动到 dst, 返回每个文件的 FileResult
+
+    dst 不存在且在同一文件系统上时整体重命名; 否则逐个文件移动 (跨文件系统时复制后删除) 并删除空的源目录。
+    """
+    if not os.path.exists(dst):
+        try:
+            os.rename(src, dst)
+            return [FileResult(rel_path, True, None, None) for rel_path in sorted(_scan_tree(dst)[1])]
+        except OSError:
+            pass
+    dirs, files = _scan_tree(src)
+    os.makedirs(dst, exist_ok=True)
+    for rel_dir in dirs:
+        os.makedirs(os.path.join(dst, rel_dir), exist_ok=True)
+    results = _for_each_file(lambda rel_path: _move_file(os.path.join(src, rel_path), os.path.join(dst, rel_path)),
+                             files, jobs)
+    if all(result.ok for result in results):
+        for rel_dir in reversed(dirs):
+            os.rmdir(os.path.join(src, rel_dir))
+        os.rmdir(src)
+    return results
+
+def remove_tree(path, jobs=None):
+    """删除文件或整个目录树, 返回每个文件的 FileResult; 文件并行删除, 之后自底向上删除空目录"""
+    if not os.path.isdir(path) or os.path.islink(path):
+        return _for_each_file(lambda rel_path: os.remove(path), [os.path.basename(path)], 1)
+    dirs, files = _scan_tree(path)
+    results = _for_each_file(lambda rel_path: os.remove(os.path.join(path, rel_path)), files, jobs)
+    for rel_dir in reversed([''] + dirs):
+        try:
+            os.rmdir(os.path.join(path, rel_dir))
+        except OSError as e:
+            results.append(FileResult(rel_dir or '.', False, None, str(e)))
+    return results
+
+def _file_digest(path, algorithm):
+    import hashlib
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, algorithm).hexdigest()
+        digest = hashlib.new(algorithm)
+        for chunk in iter(lambda: f.read(CHUNK_SIZE * 16), b''):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+def hash_tree(root, algorithm='sha256', pattern=None, jobs=None):
+    """并行计算 root 下 (递归) 每个文件的摘要, 返回 FileResult 列表 (value 为十六进制摘要)
+
+    hashlib 计算大块数据时释放 GIL, 多个文件可以同时在多个 CPU 上计算。
+    """
+    _, files = _scan_tree(root)
+    return _for_each_file(lambda rel_path: _file_digest(os.path.join(root, rel_path), algorithm),
+                          [rel_path for rel_path in files if _match(rel_path, pattern)], jobs)
+
+class Session:
+    """常驻的 shell 进程: 命令经标准输入发送, 输出和返回码以哨兵行分隔, 省去每条命令启动一次 shell
+
+    命令在同一个 shell 中依次执行, cd、变量等状态在命令之间保留 (命令超时或执行 exit 后下次自动重启 shell, 状态丢失)。
+    需要 sh 兼容的 shell。线程安全: 同一时刻只执行一条命令, 需要并发时使用 SessionPool。
+    """
+    def __init__(self, shell='/bin/sh', cwd=None, env=None):
+        self.shell = shell
+        self.cwd = cwd
+        self.env = env
+        self.lock = threading.Lock()
+        self.proc = None
+        self._stderr_lines = None
+        self._token = f'__PYPP_{os.urandom(8).hex()}__'
+
+    def _start(self):
+        import queue
+        self.proc = subprocess.Popen([self.shell], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                     stderr=subprocess.PIPE, cwd=self.cwd, env=self.env,
+                                     start_new_session=os.name == 'posix')
+        # 标准错误由后台线程读取, 命令大量输出到标准错误时不会阻塞
+        self._stderr_lines = queue.SimpleQueue()
+        threading.Thread(target=self._drain, args=(self.proc.stderr, self._stderr_lines), daemon=True).start()
+
+    @staticmethod
+    def _drain(pipe, lines):
+        for line in pipe:
+            lines.put(line)
+        lines.put(None)
+
+    def _script(self, command):
+        import shlex
+        # eval 使语法错误只影响这条命令; 哨兵前的换行保证哨兵独占一行, 读取时去掉
+        return (f"eval {shlex.quote(command)} </dev/null\n"
+                f"__pypp_status=$?\n"
+                f"printf '\\n%s %d\\n' {self._token} \"$__pypp_status\"\n"
+                f"printf '\\n%s\\n' {self._token} >&2\n").encode()
+
+    def execute(self, command, timeout=None):
+        """执行一条 shell 命令, 返回 Result; 超时时结束 shell (及命令启动的进程), 返回码为 -1"""
+        start_time = time.perf_counter()
+        marker = self._token.encode()
+        with self.lock:
+            if self.proc is None or self.proc.poll() is not None:
+                self._start()
+            proc = self.proc
+            timed_out = threading.Event()
+            timer = None
+            if timeout is not None:
+                def kill():
+                    timed_out.set()
+                    _kill(proc)
+                timer = threading.Timer(timeout, kill)
+                timer.daemon = True
+                timer.start()
+            try:
+                proc.stdin.write(self._script(command))
+                proc.stdin.flush()
+            except BrokenPipeError:
+                pass
+            returncode = None
+            out = []
+            for line in iter(proc.stdout.readline, b''):
+                if line.startswith(marker):
+                    returncode = int(line[len(marker):])
+                    break
+                out.append(line)
+            err = []
+            for line in iter(self._stderr_lines.get, None):
+                if line.startswith(marker):
+                    break
+                err.append(line)
+            if timer is not None:
+                timer.cancel()
+            output = b''.join(out)[:-1].decode(errors='replace').strip()
+            error = b''.join(err)[:-1].decode(errors='replace').strip()
+            if returncode is None:
+                # shell 已退出: 超时被结束, 或命令执行了 exit
+                self.close()
+                if timed_out.is_set():
+                    returncode, error = -1, f"超时 ({timeout}s)"
+                else:
+                    returncode = proc.returncode
+        return Result(command, returncode, output, error, time.perf_counter() - start_time)
+
+    def run(self, command, timeout=None):
+        """同 cmd.run: 返回(返回码,输出)"""
+        result = self.execute(command, timeout)
+        return result.returncode, result.output
+
+    def output(self, command, timeout=None):
+        """同 cmd.output: 返回输出(字符串)"""
+        return self.execute(command, timeout).output
+
+    def close(self):
+        """结束 shell; 之后再执行命令时自动重启"""
+        proc, self.proc = self.proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        try:
+            proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            _kill(proc)
+            proc.wait()
+        proc.stdout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class SessionPool:
+    """最多 size 个 (默认 CPU 核数) Session, 按需创建; 每条命令取一个空闲会话执行, 没有空闲会话时等待
+
+    各会话的 shell 状态互相独立, 依赖 cd 或变量的命令序列应在同一个 Session 中执行。
+    """
+    def __init__(self, size=None, **session_args):
+        self.size = size or os.cpu_count() or 1
+        import queue
+        self.session_args = session_args
+        self.sessions = []
+        # 后进先出: 优先复用刚用过的会话
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+
+    def _acquire(self):
+        import queue
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if len(self.sessions) < self.size:
+                session = Session(**self.session_args)
+                self.sessions.append(session)
+                return session
+        return self.idle.get()
+
+    def execute(self, command, timeout=None):
+        session = self._acquire()
+        try:
+            return session.execute(command, timeout)
+        finally:
+            self.idle.put(session)
+
+    def run(self, command, timeout=None):
+        result = self.execute(command, timeout)
+        return result.returncode, result.output
+
+    def output(self, command, timeout=None):
+        return self.execute(command, timeout).output
+
+    def run_many(self, cmds, timeout=None):
+        """同 cmd.run_many, 但命令在池中的会话里执行; 按输入顺序返回 Result 列表"""
+        cmds = list(cmds)
+        if not cmds:
+            return []
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(self.size, len(cmds))) as pool:
+            return list(pool.map(lambda command: self.execute(command, timeout), cmds))
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
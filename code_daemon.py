@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Python++ 常驻转换服务
+在 UNIX 套接字上常驻一个已加载转换器和解释器的进程, console.py 通过客户端请求转换,
+省去每次启动 Python 和导入模块的开销。协议为每行一个 JSON 请求/响应。
+套接字位于本用户独占 (0700) 的目录中, 服务和客户端都会核对对端的用户 ID。
+
+用法:
+    python code_daemon.py start     后台启动
+    python code_daemon.py serve     前台运行
+    python code_daemon.py status    查看状态
+    python code_daemon.py stop      停止
+"""
+
+import io
+import os
+import sys
+import json
+import stat
+import time
+import socket
+import struct
+import argparse
+import tempfile
+import threading
+import contextlib
+import subprocess
+import socketserver
+
+# 连接服务的超时 (秒); 服务不在时应立即回退, 不能拖慢 console
+CONNECT_TIMEOUT = 0.2
+
+
+class DaemonUnavailable(Exception):
+    """服务未运行或当前平台不支持 UNIX 套接字"""
+
+
+def _private_dir(path):
+    """创建或检查只有当前用户可访问的目录; 目录被他人占用或权限过宽时抛出 DaemonUnavailable"""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    except OSError as e:
+        raise DaemonUnavailable(f"无法创建套接字目录 {path}: {e}")
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise DaemonUnavailable(f"套接字目录不安全 (不是本用户独占的目录): {path}")
+    return path
+
+
+def default_socket_path():
+    """套接字路径: 环境变量 PYPP_DAEMON_SOCKET, 否则放在本用户独占的目录中
+
+    优先使用 $XDG_RUNTIME_DIR, 没有时在临时目录下创建按用户区分的 0700 目录并检查属主,
+    避免其他本地用户抢先占用可预测的路径。
+    """
+    path = os.environ.get('PYPP_DAEMON_SOCKET')
+    if path:
+        return path
+    if not hasattr(os, 'getuid'):
+        raise DaemonUnavailable("当前平台不支持 UNIX 套接字")
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir and os.path.isdir(runtime_dir):
+        directory = _private_dir(os.path.join(runtime_dir, 'pypp'))
+    else:
+        directory = _private_dir(os.path.join(tempfile.gettempdir(), f'pypp-{os.getuid()}'))
+    return os.path.join(directory, 'daemon.sock')
+
+
+def _peer_uid(sock):
+    """对端进程的用户 ID (SO_PEERCRED); 平台不支持时返回 None"""
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    return struct.unpack('3i', creds)[1]
+
+
+# ---------------------------------------------------------------- 服务端
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        # 只服务同一用户的进程
+        if _peer_uid(self.connection) not in (None, os.getuid()):
+            return
+        for raw_line in self.rfile:
+            try:
+                request = json.loads(raw_line)
+                response = self.server.dispatch(request)
+            except Exception as e:
+                response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class ConversionServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        """常驻服务; 转换请求可并发处理, 解释执行会改写全局状态和 stdout, 逐个执行"""
+        daemon_threads = True
+
+        def __init__(self, socket_path):
+            import code_to_py
+            self.code_to_py = code_to_py
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    import interpreter
+                self.interpreter = interpreter
+            except ImportError:
+                self.interpreter = None
+            self.interpret_lock = threading.Lock()
+            self.started = time.time()
+            self.requests = 0
+            # 套接字文件创建时即为 0600, 不留 bind 与 chmod 之间的空档
+            umask = os.umask(0o177)
+            try:
+                super().__init__(socket_path, _RequestHandler)
+            finally:
+                os.umask(umask)
+
+        def dispatch(self, request):
+            self.requests += 1
+            op = request.get('op')
+            handler = getattr(self, f'op_{op}', None)
+            if handler is None:
+                return {'ok': False, 'error': f"未知请求: {op}"}
+            return handler(request)
+
+        def op_ping(self, request):
+            return {'ok': True, 'pid': os.getpid(), 'converter_version': self.code_to_py.CONVERTER_VERSION,
+                    'uptime': time.time() - self.started, 'requests': self.requests,
+                    'interpreter': self.interpreter is not None}
+
+        def op_convert(self, request):
+            """转换 input (绝对路径) 到 output, 并在输出目录安装运行时模块"""
+            start_time = time.perf_counter()
+            input_file = request['input']
+            output_file = request.get('output') or os.path.splitext(input_file)[0] + '.py'
+            try:
+                self.code_to_py.convert_to(input_file, output_file)
+                self.code_to_py.install_runtime(os.path.dirname(output_file))
+            except Exception as e:
+                return {'ok': False, 'error': str(e)}
+            return {'ok': True, 'output': output_file,
+                    'elapsed_ms': (time.perf_counter() - start_time) * 1000}
+
+        def op_interpret(self, request):
+            """用新的解释器实例执行 .code 文件, 返回其输出"""
+            if self.interpreter is None:
+                return {'ok': False, 'error': "解释器不可用 (缺少 pygame?)"}
+            output = io.StringIO()
+            with self.interpret_lock, contextlib.redirect_stdout(output):
+                cwd = os.getcwd()
+                try:
+                    os.chdir(request.get('cwd') or cwd)
+                    self.interpreter.PythonPPInterpreter().run_file(request['file'])
+                finally:
+                    os.chdir(cwd)
+            return {'ok': True, 'output': output.getvalue()}
+
+        def op_shutdown(self, request):
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {'ok': True}
+
+
+def serve(socket_path=None):
+    """前台运行服务直到收到 shutdown 请求或 Ctrl+C"""
+    if not hasattr(socketserver, 'UnixStreamServer'):
+        print("错误: 当前平台不支持 UNIX 套接字")
+        return 1
+    socket_path = socket_path or default_socket_path()
+    if os.path.exists(socket_path):
+        try:
+            request({'op': 'ping'}, socket_path)
+            print(f"服务已在运行: {socket_path}")
+            return 1
+        except DaemonUnavailable:
+            # 上次异常退出留下的套接字文件
+            os.remove(socket_path)
+    server = ConversionServer(socket_path)
+    print(f"[DAEMON] 正在监听 {socket_path} (pid {os.getpid()})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+    print("[DAEMON] 已停止")
+    return 0
+
+
+def start(socket_path=None, wait=5.0):
+    """在后台启动服务并等待其可用, 返回是否成功"""
+    socket_path = socket_path or default_socket_path()
+    if available(socket_path):
+        return True
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', '--socket', socket_path],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True)
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        if available(socket_path):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+# ---------------------------------------------------------------- 客户端
+
+def request(payload, socket_path=None, timeout=None):
+    """发送一个请求并返回响应; 服务不可用时抛出 DaemonUnavailable"""
+    if not hasattr(socket, 'AF_UNIX'):
+        raise DaemonUnavailable("当前平台不支持 UNIX 套接字")
+    socket_path = socket_path or default_socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(socket_path)
+            # 对端必须是本用户启动的服务, 否则不发送任何请求
+            owner = _peer_uid(sock)
+            if owner is None:
+                owner = os.stat(socket_path).st_uid
+        except OSError as e:
+            raise DaemonUnavailable(str(e))
+        if owner != os.getuid():
+            raise DaemonUnavailable(f"套接字不属于当前用户: {socket_path}")
+        sock.settimeout(timeout)
+        try:
+            sock.sendall(json.dumps(payload, ensure_ascii=False).encode('utf-8') + b'\n')
+            with sock.makefile('rb') as f:
+                line = f.readline()
+        except (BrokenPipeError, ConnectionResetError) as e:
+            # 服务正在退出
+            raise DaemonUnavailable(str(e))
+    finally:
+        sock.close()
+    if not line:
+        raise DaemonUnavailable("服务关闭了连接")
+    return json.loads(line)
+
+
+def available(socket_path=None):
+    """服务是否在运行"""
+    try:
+        return request({'op': 'ping'}, socket_path).get('ok', False)
+    except DaemonUnavailable:
+        return False
+
+
+def convert(input_file, output_file=None, socket_path=None):
+    """请求服务转换文件, 返回 (输出文件, 错误信息); 服务不可用时抛出 DaemonUnavailable
+
+    返回的始终是本端请求的输出路径, 不采用响应中的路径。
+    """
+    input_file = os.path.abspath(input_file)
+    output_file = os.path.abspath(output_file) if output_file else os.path.splitext(input_file)[0] + '.py'
+    response = request({'op': 'convert', 'input': input_file, 'output': output_file}, socket_path)
+    if not response.get('ok'):
+        return None, response.get('error')
+    return output_file, None
+
+
+def interpret(code_file, socket_path=None):
+    """请求服务解释执行 .code 文件, 返回 (输出文本, 错误信息)"""
+    payload = {'op': 'interpret', 'file': os.path.abspath(code_file), 'cwd': os.getcwd()}
+    response = request(payload, socket_path)
+    if not response.get('ok'):
+        return None, response.get('error')
+    return response['output'], None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Python++ 常驻转换服务')
+    parser.add_argument('command', choices=['serve', 'start', 'stop', 'status'])
+    parser.add_argument('--socket', help='套接字路径 (默认放在本用户独占的运行时目录)')
+    args = parser.parse_args(argv)
+    try:
+        socket_path = args.socket or default_socket_path()
+    except DaemonUnavailable as e:
+        print(f"错误: {e}")
+        return 1
+
+    if args.command == 'serve':
+        return serve(socket_path)
+    if args.command == 'start':
+        if start(socket_path):
+            print(f"服务已启动: {socket_path}")
+            return 0
+        print("服务启动失败")
+        return 1
+    try:
+        response = request({'op': 'shutdown' if args.command == 'stop' else 'ping'}, socket_path)
+    except DaemonUnavailable:
+        print("服务未运行")
+        return 1
+    if args.command == 'stop':
+        print("服务已停止")
+    else:
+        print(f"服务运行中: pid {response['pid']}, 转换器版本 {response['converter_version']}, "
+              f"已运行 {response['uptime']:.0f}s, 处理请求 {response['requests']} 个")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
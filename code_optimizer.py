@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Python++ 转换优化
+在完整的 AST 上删除生成程序中不会产生效果的语句:
+从未布局且未被引用的控件 (连同其属性设置和事件绑定)、不可达的函数、被紧接着覆盖的属性设置。
+"""
+
+import re
+from collections import namedtuple
+
+from code_parser import Window, Control, PropertySet, Bind, Layout, Function, Value
+
+# 删除记录; kind 为 control/property/bind/function/overwritten
+Removal = namedtuple('Removal', 'kind name line reason')
+
+_IDENTIFIER_RE = re.compile(r'[A-Za-z_]\w*')
+
+# 属性值可以安全丢弃 (求值没有副作用) 的类型
+_PURE_VALUES = ('string', 'number', 'name')
+
+# 其余表达式含有这些字符时可能调用函数或读取属性, 求值不能省略, 如 read_entry()、ent1.text
+_IMPURE_CHARS = ('(', '.', '[')
+
+# 参数都是纯值时不会读取控件属性的语句; 连续的属性设置之间只隔着这些语句时, 前一次写入不可见
+_TRANSPARENT = (PropertySet, Layout, Bind, Window, Function)
+
+KIND_NAMES = {
+    'control': '控件',
+    'property': '属性设置',
+    'bind': '事件绑定',
+    'function': '函数',
+    'overwritten': '被覆盖的属性设置',
+}
+
+
+def _identifiers(node):
+    """语句文本中出现的所有标识符 (含字符串内的单词, 宁可多保留也不误删)"""
+    return set(_IDENTIFIER_RE.findall(node.text))
+
+
+def _pure_value(value):
+    """值的求值是否没有副作用且不读取任何属性"""
+    if value.kind in _PURE_VALUES:
+        return True
+    return not any(char in value.text for char in _IMPURE_CHARS)
+
+
+def _pure(node):
+    """语句的所有参数值 (含 键=值 选项) 是否都是纯值; 函数定义本身不执行, 视为纯"""
+    if isinstance(node, Function):
+        return True
+    for field in node.fields:
+        item = getattr(node, field, None)
+        if isinstance(item, Value) and not _pure_value(item):
+            return False
+        if isinstance(item, list) and any(not _pure_value(value) for _, value in item):
+            return False
+    return True
+
+
+def _children(node):
+    return getattr(node, 'body', None) or ()
+
+
+def _walk(body):
+    """深度优先遍历所有语句"""
+    for node in body:
+        yield node
+        yield from _walk(_children(node))
+
+
+def _filter(body, keep):
+    """返回去掉 keep(node) 为假的语句后的新语句列表, 语句体递归处理"""
+    result = []
+    for node in body:
+        if not keep(node):
+            continue
+        if _children(node):
+            node.body = _filter(node.body, keep)
+        result.append(node)
+    return result
+
+
+def _owned_by(node, name):
+    """该语句是否只是控件 name 自身的创建、属性设置、绑定或布局"""
+    if isinstance(node, Control):
+        return node.name == name
+    if isinstance(node, (PropertySet, Bind, Layout)):
+        return node.control == name
+    return False
+
+
+def find_dead_controls(body):
+    """从未布局、且除自身的创建/属性/绑定语句外没有在任何地方出现的控件名
+
+    自身的语句中有求值可能产生副作用的 (如 hidden.text = load_data()) 控件不算无效。
+    """
+    controls = {}
+    laid_out = set()
+    mentions = {}
+    for node in _walk(body):
+        if isinstance(node, Control):
+            controls.setdefault(node.name, node)
+        elif isinstance(node, Layout):
+            laid_out.add(node.control)
+    candidates = set(controls) - laid_out
+    if not candidates:
+        return {}
+    for node in _walk(body):
+        for name in _identifiers(node) & candidates:
+            if not _owned_by(node, name) or not _pure(node):
+                mentions[name] = True
+    return {name: controls[name] for name in candidates if name not in mentions}
+
+
+def find_dead_functions(body):
+    """从函数体之外的语句出发不可达的函数名 (嵌套在函数中的函数随外层函数处理)"""
+    functions = {}
+    references = {}
+    roots = set()
+
+    def visit(nodes, owner):
+        for node in nodes:
+            if isinstance(node, Function) and owner is None:
+                functions.setdefault(node.name, node)
+                refs = references.setdefault(node.name, set())
+                visit(node.body, refs)
+                continue
+            target = roots if owner is None else owner
+            if isinstance(node, Function):
+                target.add(node.name)
+            else:
+                target.update(_identifiers(node))
+            visit(_children(node), owner)
+
+    visit(body, None)
+    live = set()
+    stack = [name for name in roots if name in functions]
+    while stack:
+        name = stack.pop()
+        if name in live:
+            continue
+        live.add(name)
+        stack.extend(ref for ref in references[name] if ref in functions and ref not in live)
+    return {name: node for name, node in functions.items() if name not in live}
+
+
+def _find_overwritten(body, dead):
+    """同一语句列表中, 在被读取前又被写入同一属性的字面量属性设置"""
+    pending = {}
+    for node in body:
+        if isinstance(node, PropertySet):
+            key = (node.control, node.prop)
+            if not _pure_value(node.value):
+                # 求值可能读取属性 (包括自身, 如 ent1.text = ent1.text + "!"), 之前的写入都可见
+                pending.clear()
+            previous = pending.get(key)
+            if previous is not None and _pure_value(previous.value):
+                dead[id(previous)] = (previous, node)
+            pending[key] = node
+        elif isinstance(node, Control):
+            for key in [key for key in pending if key[0] == node.name]:
+                del pending[key]
+        elif not isinstance(node, _TRANSPARENT) or not _pure(node):
+            pending.clear()
+        if _children(node):
+            _find_overwritten(node.body, dead)
+
+
+def prune(program):
+    """就地删除 program 中的无效语句, 返回 Removal 列表"""
+    removals = []
+
+    dead_controls = find_dead_controls(program.body)
+    if dead_controls:
+        def keep_control(node):
+            for name in dead_controls:
+                if _owned_by(node, name):
+                    if isinstance(node, Control):
+                        removals.append(Removal('control', name, node.line, '从未布局'))
+                    elif isinstance(node, PropertySet):
+                        removals.append(Removal('property', f'{name}.{node.prop}', node.line, '控件已删除'))
+                    else:
+                        removals.append(Removal('bind', name, node.line, '控件已删除'))
+                    return False
+            return True
+        program.body = _filter(program.body, keep_control)
+
+    dead_functions = find_dead_functions(program.body)
+    if dead_functions:
+        def keep_function(node):
+            if isinstance(node, Function) and node.name in dead_functions:
+                removals.append(Removal('function', node.name, node.line, '未被引用'))
+                return False
+            return True
+        program.body = _filter(program.body, keep_function)
+
+    overwritten = {}
+    _find_overwritten(program.body, overwritten)
+    if overwritten:
+        for node, later in overwritten.values():
+            removals.append(Removal('overwritten', f'{node.control}.{node.prop}', node.line,
+                                    f'被第 {later.line} 行覆盖'))
+        program.body = _filter(program.body, lambda node: id(node) not in overwritten)
+
+    removals.sort(key=lambda removal: removal.line)
+    return removals
+
+
+def summarize(removals):
+    """删除记录的一行摘要, 如 "控件 3, 函数 2"; 没有删除时返回空字符串"""
+    counts = {}
+    for removal in removals:
+        counts[removal.kind] = counts.get(removal.kind, 0) + 1
+    return ', '.join(f"{KIND_NAMES[kind]} {count}" for kind, count in counts.items())
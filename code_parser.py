@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Python++ .code 词法/语法分析器
+单遍词法分析 + 递归下降语法分析, 生成带源码位置 (行号从 1 开始, 列号从 0 开始) 的 AST
+"""
+
+import re
+import ast
+import sys
+import time
+from collections import namedtuple
+
+# 词法单元类型
+NAME = 'NAME'
+NUMBER = 'NUMBER'
+STRING = 'STRING'
+OP = 'OP'
+NEWLINE = 'NEWLINE'
+INDENT = 'INDENT'
+DEDENT = 'DEDENT'
+EOF = 'EOF'
+
+# 支持的控件类型
+CONTROL_TYPES = frozenset([
+    'button', 'label', 'entry', 'text', 'listbox',
+    'combobox', 'checkbox', 'radiobutton', 'image',
+])
+# 带缩进语句块的关键字, 语句头末尾的冒号可省略
+BLOCK_KEYWORDS = frozenset([
+    'if', 'elif', 'else', 'for', 'while', 'try', 'except', 'finally', 'with', 'def', 'class',
+])
+LAYOUT_METHODS = frozenset(['pack', 'grid', 'place'])
+# 显示/隐藏窗口的语句关键字
+WINDOW_ACTIONS = frozenset(['show', 'hide'])
+
+# 每次匹配跳过前导空白并读取一个记号; 只有前面是空白的 # 才开始注释, 因此 bg=#ffffff 中的 # 是普通符号
+_TOKEN_RE = re.compile(r'''
+    [ \t]*
+    (?:
+    (?P<comment>(?<=[ \t])\#.*)
+  | (?P<name>[^\W\d]\w*)
+  | (?P<number>\d\w*(?:\.\d\w*)?\.?)
+  | (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<op>==|!=|<=|>=|\*\*|//|->|[-+*/%&|^<>]=|\S)
+    )
+''', re.VERBOSE)
+
+# 正则分组序号 (m.lastindex) 对应的记号类型
+_GROUP_TYPES = (None, 'COMMENT', NAME, NUMBER, STRING, OP)
+
+
+class _Malformed(Exception):
+    """非严格模式下语句不符合 GUI 语法, 退化为普通语句"""
+
+
+class CodeSyntaxError(SyntaxError):
+    """.code 语法错误, 携带出错位置"""
+    def __init__(self, message, line, col, text=None, filename=None):
+        super().__init__(f"第 {line} 行第 {col + 1} 列: {message}", (filename, line, col + 1, text))
+        self.line = line
+        self.col = col
+
+
+class Token(namedtuple('Token', 'type value line col end')):
+    """词法单元; col/end 为该记号在源码行中的起止列"""
+    __slots__ = ()
+
+
+def scan_lines(source_lines, filename=None, strict=True):
+    """单遍词法分析: 惰性读取源码行, 按逻辑行产出 (类型, 行号, 记号列表, 源码文本)
+
+    类型为 INDENT、DEDENT、NEWLINE 或 EOF; NEWLINE 项的源码文本是该行去掉缩进和行尾注释后的内容。
+    以 /* 开头的行开始块注释, 直到包含 */ 的行 (可以是同一行) 为止, 其间的行整行跳过。
+    非严格模式下缺少结束引号的引号作为普通符号, 由语法分析退化为普通语句。
+    """
+    indents = [0]
+    finditer = _TOKEN_RE.finditer
+    group_types = _GROUP_TYPES
+    lineno = 0
+    in_comment = False
+    for lineno, line in enumerate(source_lines, 1):
+        line = line.rstrip('\r\n')
+        if in_comment:
+            in_comment = '*/' not in line
+            continue
+        length = len(line)
+
+        # 计算缩进宽度, 制表符按 4 个空格计
+        pos = width = 0
+        while pos < length and line[pos] in ' \t':
+            width += 4 if line[pos] == '\t' else 1
+            pos += 1
+        if pos == length or line[pos] == '#':
+            continue
+        if line.startswith('/*', pos):
+            in_comment = '*/' not in line[pos + 2:]
+            continue
+
+        if width > indents[-1]:
+            indents.append(width)
+            yield INDENT, lineno, None, ''
+        while width < indents[-1]:
+            indents.pop()
+            yield DEDENT, lineno, None, ''
+            if width > indents[-1]:
+                # 回退到不存在的缩进层级时按外层处理
+                indents.append(width)
+
+        tokens = [Token(group_types[m.lastindex], m[m.lastindex], lineno, m.start(m.lastindex), m.end())
+                  for m in finditer(line, pos)]
+        code_end = length
+        if tokens[-1].type == 'COMMENT':
+            code_end = tokens.pop().col
+        if strict:
+            for tok in tokens:
+                if tok.type == OP and (tok.value == '"' or tok.value == "'"):
+                    raise CodeSyntaxError("字符串缺少结束引号", lineno, tok.col, line, filename)
+
+        yield NEWLINE, lineno, tokens, line[pos:code_end].rstrip()
+
+    for _ in indents[1:]:
+        yield DEDENT, lineno + 1, None, ''
+    yield EOF, lineno + 1, None, ''
+
+
+def tokenize(source_lines, filename=None, strict=True):
+    """产出扁平的 Token 流 (含 INDENT/DEDENT/NEWLINE/EOF), NEWLINE 的 value 为该行源码文本"""
+    for kind, lineno, tokens, text in scan_lines(source_lines, filename, strict):
+        if tokens is None:
+            yield Token(kind, '', lineno, 0, 0)
+            continue
+        yield from tokens
+        yield Token(NEWLINE, text, lineno, tokens[0].col, tokens[0].col + len(text))
+
+
+# ---------------------------------------------------------------- AST 节点
+
+class Node:
+    """AST 节点基类; text 为该语句去掉缩进后的源码文本"""
+    __slots__ = ('line', 'col', 'text')
+    fields = ()
+
+    def __repr__(self):
+        args = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.fields)
+        return f"{type(self).__name__}({args})@{self.line}:{self.col}"
+
+
+class Value(Node):
+    """参数值; kind 为 string (text 已去引号并反转义)、number、name 或 raw"""
+    __slots__ = ('kind',)
+    fields = ('kind', 'text')
+
+    def __init__(self, kind, text, line, col):
+        self.kind, self.text, self.line, self.col = kind, text, line, col
+
+    def as_python(self):
+        """作为 Python 表达式的源码"""
+        return repr(self.text) if self.kind == 'string' else self.text
+
+
+class Program(Node):
+    __slots__ = ('body',)
+    fields = ('body',)
+
+    def __init__(self, body):
+        self.body, self.line, self.col, self.text = body, 1, 0, ''
+
+
+class Window(Node):
+    __slots__ = ('name', 'title', 'width', 'height', 'options')
+    fields = ('name', 'title', 'width', 'height', 'options')
+
+
+class Control(Node):
+    __slots__ = ('control_type', 'name', 'label', 'options')
+    fields = ('control_type', 'name', 'label', 'options')
+
+
+class PropertySet(Node):
+    __slots__ = ('control', 'prop', 'value')
+    fields = ('control', 'prop', 'value')
+
+
+class Bind(Node):
+    __slots__ = ('control', 'event', 'handler')
+    fields = ('control', 'event', 'handler')
+
+
+class Layout(Node):
+    __slots__ = ('method', 'control', 'options')
+    fields = ('method', 'control', 'options')
+
+
+class WindowAction(Node):
+    """show/hide 窗口; action 为 show 或 hide"""
+    __slots__ = ('action', 'window')
+    fields = ('action', 'window')
+
+
+class Function(Node):
+    __slots__ = ('name', 'body')
+    fields = ('name', 'body')
+
+
+class Block(Node):
+    """带缩进语句体的语句, 如 if/for/while; header 不含末尾冒号"""
+    __slots__ = ('keyword', 'header', 'body')
+    fields = ('keyword', 'header', 'body')
+
+
+class Suite(Node):
+    """意外缩进的一组语句, 按所在层级展开"""
+    __slots__ = ('body',)
+    fields = ('body',)
+
+
+class Call(Node):
+    __slots__ = ('name',)
+    fields = ('name', 'text')
+
+
+class Assign(Node):
+    __slots__ = ('target', 'value')
+    fields = ('target', 'value')
+
+
+class Expr(Node):
+    """其它语句, 原样保留为 Python 代码"""
+    __slots__ = ()
+    fields = ('text',)
+
+
+def _make(cls, first, text, **fields):
+    node = cls.__new__(cls)
+    node.line, node.col, node.text = first.line, first.col, text
+    for name, value in fields.items():
+        setattr(node, name, value)
+    return node
+
+
+# ---------------------------------------------------------------- 语法分析
+
+class Parser:
+    """递归下降语法分析器
+
+    program   := statement* EOF
+    statement := simple NEWLINE [block]
+    block     := INDENT statement+ DEDENT
+    simple    := window | control | bind | layout | function
+               | show | hide | property | call | assign | expr
+
+    输入为 scan_lines 产出的逻辑行, 每个 NEWLINE 项携带该行的记号列表。
+    """
+
+    def __init__(self, lines, filename=None, strict=True):
+        self.lines = iter(lines)
+        self.filename = filename
+        self.strict = strict
+        self.advance()
+
+    def advance(self):
+        item = self.item = next(self.lines)
+        self.kind = item[0]
+        return item
+
+    def error(self, message, tok, text=None):
+        if not self.strict:
+            raise _Malformed(message)
+        raise CodeSyntaxError(message, tok.line, tok.col, text, self.filename)
+
+    def parse_program(self):
+        return Program(list(self.iter_statements()))
+
+    def iter_statements(self):
+        """惰性产出顶层语句, 每条语句 (含其语句体) 完整解析后再产出"""
+        while self.kind != EOF:
+            if self.kind == DEDENT:
+                self.advance()
+                continue
+            yield self.parse_statement()
+
+    def parse_statement(self):
+        if self.kind == INDENT:
+            lineno = self.item[1]
+            node = Suite.__new__(Suite)
+            node.line, node.col, node.text = lineno, 0, ''
+            node.body = self.parse_block()
+            return node
+
+        _, _, tokens, text = self.item
+        self.advance()
+        node = self.parse_simple(tokens, text)
+
+        if self.kind == INDENT:
+            if isinstance(node, Expr) and text.endswith(':'):
+                node = _make(Block, tokens[0], text, keyword=tokens[0].value, header=text[:-1].rstrip(), body=[])
+            if isinstance(node, (Function, Block)):
+                node.body = self.parse_block()
+        return node
+
+    def parse_block(self):
+        self.advance()  # INDENT
+        body = []
+        while self.kind != DEDENT and self.kind != EOF:
+            body.append(self.parse_statement())
+        if self.kind == DEDENT:
+            self.advance()
+        return body
+
+    def parse_simple(self, tokens, text):
+        first = tokens[0]
+        keyword = first.value if first.type == NAME else None
+        second = tokens[1] if len(tokens) > 1 else None
+        # 关键字后紧跟 = 或 . 时是普通赋值/属性访问, 例如 text = 1
+        follow = second.value if second is not None and second.type == OP else None
+
+        if keyword in BLOCK_KEYWORDS and follow not in ('=', '.'):
+            header = text[:-1].rstrip() if text.endswith(':') else text
+            return _make(Block, first, text, keyword=keyword, header=header, body=[])
+        if keyword and second is not None and follow not in ('=', '.', '('):
+            try:
+                if keyword == 'window':
+                    return self.parse_window(tokens, text)
+                if keyword in CONTROL_TYPES:
+                    return self.parse_control(tokens, text)
+                if keyword == 'bind':
+                    return self.parse_bind(tokens, text)
+                if keyword in LAYOUT_METHODS:
+                    return self.parse_layout(tokens, text)
+                if keyword == 'function':
+                    return self.parse_function(tokens, text)
+                if keyword in WINDOW_ACTIONS:
+                    return self.parse_window_action(tokens, text)
+            except _Malformed:
+                return _make(Expr, first, text)
+
+        if keyword and second and second.type == OP:
+            # 属性设置: ctl.prop = value
+            if (second.value == '.' and len(tokens) >= 5 and tokens[2].type == NAME
+                    and tokens[3].type == OP and tokens[3].value == '='):
+                value = self.parse_expression(tokens, 4, text)
+                return _make(PropertySet, first, text, control=keyword, prop=tokens[2].value, value=value)
+            # 函数调用: name(...)
+            if second.value == '(' and tokens[-1].type == OP and tokens[-1].value == ')':
+                return _make(Call, first, text, name=keyword)
+            # 变量赋值: name = expr
+            if second.value == '=' and len(tokens) > 2:
+                return _make(Assign, first, text, target=keyword, value=self.parse_expression(tokens, 2, text))
+        return _make(Expr, first, text)
+
+    def parse_window(self, tokens, text):
+        # window main "My App" 800 600
+        values, options = self.parse_arguments(tokens, 2, text)
+        if len(tokens) < 3 or tokens[1].type != NAME or not values:
+            self.error("window 语法错误, 应为: window 名称 \"标题\" [宽] [高]", tokens[0], text)
+        width = values[1] if len(values) > 1 else None
+        height = values[2] if len(values) > 2 else None
+        return _make(Window, tokens[0], text, name=tokens[1].value, title=values[0],
+                     width=width, height=height, options=options)
+
+    def parse_control(self, tokens, text):
+        # button btn1 "Click Me" command=onclick
+        if tokens[1].type != NAME:
+            self.error("控件名称必须是标识符", tokens[1], text)
+        values, options = self.parse_arguments(tokens, 2, text)
+        return _make(Control, tokens[0], text, control_type=tokens[0].value, name=tokens[1].value,
+                     label=values[0] if values else None, options=options)
+
+    def parse_bind(self, tokens, text):
+        # bind btn1 click onclick
+        if len(tokens) < 4:
+            self.error("bind 语法错误, 应为: bind 控件 事件 函数", tokens[0], text)
+        for tok in tokens[1:4]:
+            if tok.type != NAME:
+                self.error("bind 语法错误, 应为: bind 控件 事件 函数", tok, text)
+        return _make(Bind, tokens[0], text, control=tokens[1].value, event=tokens[2].value, handler=tokens[3].value)
+
+    def parse_layout(self, tokens, text):
+        # pack btn1 side=left fill=x
+        if tokens[1].type != NAME:
+            self.error("布局语句的控件名称必须是标识符", tokens[1], text)
+        _, options = self.parse_arguments(tokens, 2, text)
+        return _make(Layout, tokens[0], text, method=tokens[0].value, control=tokens[1].value, options=options)
+
+    def parse_function(self, tokens, text):
+        # function onclick  或  function onclick()
+        if len(tokens) < 2 or tokens[1].type != NAME:
+            self.error("function 语法错误, 应为: function 函数名", tokens[0], text)
+        return _make(Function, tokens[0], text, name=tokens[1].value, body=[])
+
+    def parse_window_action(self, tokens, text):
+        # show settings  或  hide settings
+        if len(tokens) != 2 or tokens[1].type != NAME:
+            self.error(f"{tokens[0].value} 语法错误, 应为: {tokens[0].value} 窗口名", tokens[0], text)
+        return _make(WindowAction, tokens[0], text, action=tokens[0].value, window=tokens[1].value)
+
+    def parse_arguments(self, tokens, index, text):
+        """解析 `值` 与 `键=值` 参数, 返回 (位置参数列表, [(键, 值)])"""
+        values = []
+        options = []
+        count = len(tokens)
+        while index < count:
+            tok = tokens[index]
+            if (tok.type == NAME and index + 2 < count and tokens[index + 1].type == OP
+                    and tokens[index + 1].value == '=' and tokens[index + 1].col == tok.end):
+                value, index = self.parse_value(tokens, index + 2, text)
+                options.append((tok.value, value))
+            else:
+                value, index = self.parse_value(tokens, index, text)
+                values.append(value)
+        return values, options
+
+    def parse_value(self, tokens, index, text):
+        """解析一个参数值; 相邻 (无空白分隔) 的记号合并为一个值, 如 #ff0000、300x200"""
+        first = tokens[index]
+        end = index + 1
+        while end < len(tokens) and tokens[end].col == tokens[end - 1].end:
+            end += 1
+        if end == index + 1:
+            if first.type == STRING:
+                return Value('string', _unquote(first.value), first.line, first.col), end
+            if first.type in (NUMBER, NAME):
+                kind = 'number' if first.type == NUMBER else 'name'
+                return Value(kind, first.value, first.line, first.col), end
+        offset = tokens[0].col
+        raw = text[first.col - offset:tokens[end - 1].end - offset]
+        return Value('raw', raw, first.line, first.col), end
+
+    def parse_expression(self, tokens, index, text):
+        """把 tokens[index:] 作为一个表达式; 单个字符串/数字/名称记号得到对应类型的值"""
+        first = tokens[index]
+        if len(tokens) == index + 1:
+            value, _ = self.parse_value(tokens, index, text)
+            return value
+        raw = text[first.col - tokens[0].col:]
+        return Value('raw', raw, first.line, first.col)
+
+
+def _unquote(literal):
+    """去掉字符串字面量的引号并处理转义"""
+    if '\\' not in literal:
+        return literal[1:-1]
+    return ast.literal_eval(literal)
+
+
+def parse(source_lines, filename=None, strict=True):
+    """把源码行解析为 Program; 非严格模式下不符合 GUI 语法的语句保留为 Expr"""
+    return Parser(scan_lines(source_lines, filename, strict), filename, strict).parse_program()
+
+
+def iter_parse(source_lines, filename=None, strict=True):
+    """惰性解析, 逐条产出顶层语句, 用于流式转换"""
+    return Parser(scan_lines(source_lines, filename, strict), filename, strict).iter_statements()
+
+
+def parse_line(line, strict=True):
+    """解析单行语句 (忽略其语句体)"""
+    for node in iter_parse([line], strict=strict):
+        return node
+    return None
+
+
+def synthetic_corpus(line_count):
+    """生成包含各类语句的合成 .code 源码行, 用于基准测试"""
+    yield 'window main "Synthetic App" 800 600\n'
+    i = 0
+    while i < line_count:
+        yield f'button btn{i} "Button {i} = ok" command=handler{i} bg=#ffeedd\n'
+        yield f'label lbl{i} "Label {i}" width=20\n'
+        yield f'pack btn{i} side=top pady=5\n'
+        yield f'function handler{i}\n'
+        yield f'    lbl{i}.text = "clicked {i}"\n'
+        yield f'    if count > {i}\n'
+        yield f'        count = count + 1  # 计数\n'
+        yield f'bind btn{i} click handler{i}\n'
+        i += 8
+
+
+def benchmark(sizes=(10000, 100000, 1000000)):
+    """在不同规模的合成语料上测量词法+语法分析吞吐量, 验证线性复杂度"""
+    results = []
+    for size in sizes:
+        lines = list(synthetic_corpus(size))
+        start = time.perf_counter()
+        count = 0
+        for _ in iter_parse(lines):
+            count += 1
+        elapsed = time.perf_counter() - start
+        results.append((len(lines), elapsed))
+        print(f"{len(lines):>9} 行: {elapsed:.3f}s, {len(lines) / elapsed:,.0f} 行/秒")
+    return results
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] != '--bench':
+        with open(sys.argv[1], 'r', encoding='utf-8') as f:
+            for node in iter_parse(f, sys.argv[1]):
+                print(node)
+    else:
+        benchmark()
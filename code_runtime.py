@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Python++ 运行时
+转换生成的 .py 文件共用的 GUI 控制管理器; 转换器把本模块复制到输出目录并预编译,
+生成的程序只需导入, 不必在每个文件中重复定义和编译。
+
+程序中用 show 打开的子窗口是延迟窗口: main() 中只记录窗口和控件的描述,
+第一次 show 时才创建 Toplevel 和控件; 关闭时按 close 选项隐藏 (再次 show 直接复用) 或销毁 (下次 show 重建)。
+"""
+
+import os
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog, simpledialog
+
+# 窗口关闭时的处理方式; 延迟窗口默认 hide
+CLOSE_MODES = ('hide', 'destroy')
+# 设置此环境变量时 run() 在完成首次绘制后立即退出, 用于测量启动耗时
+STARTUP_PROBE_VAR = 'PYPP_STARTUP_PROBE'
+
+
+def _build_control(control_type, parent_window, kwargs):
+    if control_type == 'button':
+        control = tk.Button(parent_window, **kwargs)
+    elif control_type == 'label':
+        control = tk.Label(parent_window, **kwargs)
+    elif control_type == 'entry':
+        control = tk.Entry(parent_window, **kwargs)
+    elif control_type == 'text':
+        control = tk.Text(parent_window, **kwargs)
+    elif control_type == 'listbox':
+        control = tk.Listbox(parent_window, **kwargs)
+    elif control_type == 'combobox':
+        control = ttk.Combobox(parent_window, **kwargs)
+    elif control_type == 'checkbox':
+        control = tk.Checkbutton(parent_window, **kwargs)
+    elif control_type == 'radiobutton':
+        control = tk.Radiobutton(parent_window, **kwargs)
+    elif control_type == 'image':
+        control = tk.Label(parent_window, **kwargs)
+    else:
+        control = tk.Label(parent_window, text=f'Unknown control: {control_type}')
+    return control
+
+
+def _configure(control, options):
+    """设置控件选项; 某个属性不是该控件的 Tk 选项时逐个设置, 不是选项的属性回退为 setattr (同 set_property)"""
+    try:
+        control.configure(options)
+    except tk.TclError:
+        for name, value in options.items():
+            try:
+                control.configure({name: value})
+            except tk.TclError:
+                if hasattr(control, name):
+                    setattr(control, name, value)
+
+
+class LazyControl:
+    """延迟窗口中的控件代理
+
+    窗口实例化前记录 configure、布局和 bind 调用; 实例化时用记录的选项创建真实控件并重放布局和绑定,
+    之后的调用转发给真实控件 (同时继续记录, 窗口销毁后按最新状态重建)。
+    访问其它属性或方法 (如 get、insert) 时先在隐藏状态下实例化所在窗口。
+    """
+    def __init__(self, manager, window, control_type, kwargs):
+        self._manager = manager
+        self._window = window
+        self._control_type = control_type
+        self._options = dict(kwargs)
+        self._layout = None
+        self._binds = []
+        self._widget = None
+
+    def _materialize(self, parent_window):
+        try:
+            self._widget = _build_control(self._control_type, parent_window, self._options)
+        except tk.TclError:
+            # 记录的选项中有该控件不支持的, 先创建再逐个设置
+            self._widget = _build_control(self._control_type, parent_window, {})
+            _configure(self._widget, self._options)
+        for sequence, func, add in self._binds:
+            self._widget.bind(sequence, func, add)
+        if self._layout is not None:
+            method, kwargs = self._layout
+            getattr(self._widget, method)(**kwargs)
+
+    def _real(self):
+        if self._widget is None:
+            self._manager.materialize_window(self._window)
+        return self._widget
+
+    def configure(self, cnf=None, **kwargs):
+        if cnf is None and not kwargs:
+            return self._real().configure()
+        options = dict(cnf or {}, **kwargs)
+        self._options.update(options)
+        if self._widget is not None:
+            _configure(self._widget, options)
+
+    config = configure
+
+    def cget(self, key):
+        if self._widget is None and key in self._options:
+            return self._options[key]
+        return self._real().cget(key)
+
+    def __setitem__(self, key, value):
+        self.configure({key: value})
+
+    def __getitem__(self, key):
+        return self.cget(key)
+
+    def bind(self, sequence=None, func=None, add=None):
+        if func is None:
+            return self._real().bind(sequence)
+        self._binds.append((sequence, func, add))
+        if self._widget is not None:
+            return self._widget.bind(sequence, func, add)
+
+    def _set_layout(self, method, kwargs):
+        self._layout = (method, kwargs)
+        if self._widget is not None:
+            getattr(self._widget, method)(**kwargs)
+
+    def pack(self, **kwargs):
+        self._set_layout('pack', kwargs)
+
+    def grid(self, **kwargs):
+        self._set_layout('grid', kwargs)
+
+    def place(self, **kwargs):
+        self._set_layout('place', kwargs)
+
+    def destroy(self):
+        if self._widget is not None:
+            self._widget.destroy()
+            self._widget = None
+        self._manager.lazy_controls[self._window].remove(self)
+
+    def __getattr__(self, name):
+        return getattr(self._real(), name)
+
+
+# GUI 控制管理器
+class GUIControlManager:
+    def __init__(self):
+        self.controls = {}
+        self.windows = {}
+        self.root = None
+        # 延迟创建的窗口名 (生成的程序在调用 main() 前设置), 以及这些窗口的描述和控件代理
+        self.lazy_windows = set()
+        self.window_specs = {}
+        self.lazy_controls = {}
+
+    def set_lazy_windows(self, names):
+        self.lazy_windows.update(names)
+
+    def create_window(self, name, title, width=800, height=600, close=None):
+        if name in self.windows or name in self.window_specs:
+            return self.windows.get(name)
+        if self.root is not None and name in self.lazy_windows:
+            # 主窗口总是立即创建; 子窗口只记录描述, 第一次 show 时实例化
+            self.window_specs[name] = (title, width, height, close or 'hide')
+            self.lazy_controls[name] = []
+            return None
+        return self._build_window(name, title, width, height, close)
+
+    def _build_window(self, name, title, width, height, close):
+        window = tk.Tk() if self.root is None else tk.Toplevel(self.root)
+        if self.root is None:
+            self.root = window
+        window.title(title)
+        window.geometry(f'{width}x{height}')
+        if window is not self.root:
+            if close == 'hide':
+                window.protocol('WM_DELETE_WINDOW', window.withdraw)
+            elif close == 'destroy':
+                window.protocol('WM_DELETE_WINDOW', lambda: self.destroy_window(name))
+        self.windows[name] = window
+        return window
+
+    def materialize_window(self, name):
+        """实例化延迟窗口 (保持隐藏) 并创建其中的控件, 返回窗口"""
+        window = self.windows.get(name)
+        if window is None:
+            title, width, height, close = self.window_specs[name]
+            window = self._build_window(name, title, width, height, close)
+            window.withdraw()
+            for proxy in self.lazy_controls[name]:
+                proxy._materialize(window)
+        return window
+
+    def show_window(self, name):
+        if name in self.window_specs:
+            window = self.materialize_window(name)
+        else:
+            window = self.windows.get(name)
+        if window is not None:
+            window.deiconify()
+            window.lift()
+
+    def hide_window(self, name):
+        window = self.windows.get(name)
+        if window is not None:
+            window.withdraw()
+
+    def destroy_window(self, name):
+        """销毁窗口; 延迟窗口的控件代理保留最新状态, 下次 show 时重建"""
+        window = self.windows.pop(name, None)
+        if window is None:
+            return
+        window.destroy()
+        for proxy in self.lazy_controls.get(name, ()):
+            proxy._widget = None
+
+    def create_control(self, control_type, name, parent='main', **kwargs):
+        if parent not in self.windows and parent not in self.window_specs:
+            parent = 'main'
+        if parent in self.window_specs and parent not in self.windows:
+            control = LazyControl(self, parent, control_type, kwargs)
+            self.lazy_controls[parent].append(control)
+        else:
+            control = _build_control(control_type, self.windows[parent], kwargs)
+        self.controls[name] = control
+        return control
+
+    def configure(self, control, **options):
+        """生成代码中对已知控件的属性设置; 与 set_property 相同, 非 Tk 选项的属性不会引发 TclError"""
+        if isinstance(control, LazyControl):
+            control.configure(options)
+        else:
+            _configure(control, options)
+
+    def set_property(self, control_name, property_name, value):
+        # 控件选项 (text、fg 等) 必须通过 configure 设置, setattr 不会改变控件外观
+        if control_name in self.controls:
+            control = self.controls[control_name]
+            try:
+                control.configure({property_name: value})
+            except tk.TclError:
+                if hasattr(control, property_name):
+                    setattr(control, property_name, value)
+
+    def get_property(self, control_name, property_name):
+        if control_name in self.controls:
+            control = self.controls[control_name]
+            try:
+                return control.cget(property_name)
+            except tk.TclError:
+                if hasattr(control, property_name):
+                    return getattr(control, property_name)
+        return None
+
+    def bind_event(self, control_name, event, handler):
+        if control_name in self.controls:
+            control = self.controls[control_name]
+            control.bind(event, handler)
+
+    def layout(self, control_name, method='pack', **kwargs):
+        if control_name in self.controls:
+            control = self.controls[control_name]
+            if method == 'pack':
+                control.pack(**kwargs)
+            elif method == 'grid':
+                control.grid(**kwargs)
+            elif method == 'place':
+                control.place(**kwargs)
+
+    def remove_control(self, control_name):
+        if control_name in self.controls:
+            control = self.controls[control_name]
+            control.destroy()
+            del self.controls[control_name]
+
+    def show_message(self, title, message, message_type='info'):
+        if message_type == 'info':
+            messagebox.showinfo(title, message)
+        elif message_type == 'warning':
+            messagebox.showwarning(title, message)
+        elif message_type == 'error':
+            messagebox.showerror(title, message)
+        elif message_type == 'question':
+            return messagebox.askyesno(title, message)
+
+    def show_input_dialog(self, title, prompt):
+        return simpledialog.askstring(title, prompt)
+
+    def show_file_dialog(self, title, file_types):
+        return filedialog.askopenfilename(title=title, filetypes=file_types)
+
+    def run(self):
+        if self.root:
+            if os.environ.get(STARTUP_PROBE_VAR):
+                # 启动耗时测量: 处理完首次绘制后退出, 不进入主循环
+                self.root.update()
+                self.root.destroy()
+                return
+            self.root.mainloop()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Python++ 源码映射
+生成的 .py 文件末尾嵌入 "生成代码行号 -> .code 行号" 的紧凑映射表,
+运行时钩子据此把异常回溯和性能分析输出改写为 .code 文件中的位置。
+
+映射表只记录连续对应关系中断的位置 (py 起始行:code 起始行, code 为 0 表示无对应源码),
+以多行字符串字面量嵌入, 导入时不解析, 第一次查询时才解码。
+"""
+
+import os
+import sys
+import ast
+import bisect
+import linecache
+import traceback
+from array import array
+
+# 嵌入在生成文件中的变量名
+SOURCE_VAR = '__CODE_SOURCE__'
+LINE_MAP_VAR = '__CODE_LINE_MAP__'
+# 映射表每行的条目数
+ENTRIES_PER_LINE = 500
+
+# 已注册的映射 {规范化的 .py 路径: SourceMap}
+_registry = {}
+
+
+class LineMapBuilder:
+    """转换时逐行记录映射 (py_line 依次递增)
+
+    只在对应关系不再是 "py 行和 .code 行同步加一" 时记录一个条目, 逐行对应的代码段只占一个条目。
+    """
+    def __init__(self):
+        self.py_lines = array('l')
+        self.code_lines = array('l')
+
+    def add(self, py_line, code_line):
+        """记录第 py_line 行生成代码来自 .code 第 code_line 行 (0 表示无对应源码)"""
+        if self.py_lines:
+            last_code = self.code_lines[-1]
+            if code_line == (last_code and last_code + py_line - self.py_lines[-1]):
+                return
+        self.py_lines.append(py_line)
+        self.code_lines.append(code_line)
+
+    def table_lines(self, source_name):
+        """逐行产出嵌入到 .py 文件中的映射表代码"""
+        yield "# .code 源码映射: 生成代码行号 -> .code 行号"
+        yield f"{SOURCE_VAR} = {source_name!r}"
+        yield f"{LINE_MAP_VAR} = ("
+        for start in range(0, len(self.py_lines), ENTRIES_PER_LINE):
+            entries = ' '.join(f"{py_line}:{code_line}" for py_line, code_line in
+                               zip(self.py_lines[start:start + ENTRIES_PER_LINE],
+                                   self.code_lines[start:start + ENTRIES_PER_LINE]))
+            yield f"    '{entries} '"
+        yield "    '')"
+        yield "try:"
+        yield "    import code_sourcemap"
+        yield f"    code_sourcemap.register(__file__, {SOURCE_VAR}, {LINE_MAP_VAR})"
+        yield "except ImportError:"
+        yield "    pass"
+
+
+def decode(line_map):
+    """把嵌入的映射表解码为 (py 起始行数组, code 起始行数组)"""
+    py_lines, code_lines = array('l'), array('l')
+    for entry in line_map.split():
+        py_line, code_line = entry.split(':')
+        py_lines.append(int(py_line))
+        code_lines.append(int(code_line))
+    return py_lines, code_lines
+
+
+class SourceMap:
+    def __init__(self, py_file, code_file, line_map):
+        self.py_file = py_file
+        self.code_file = code_file
+        self.line_map = line_map
+        self.py_lines = self.code_lines = None
+
+    def lookup(self, py_line):
+        """返回 py_line 对应的 .code 行号, 没有对应源码时返回 None; O(log n)"""
+        if self.py_lines is None:
+            self.py_lines, self.code_lines = decode(self.line_map)
+            self.line_map = None
+        index = bisect.bisect_right(self.py_lines, py_line) - 1
+        if index < 0 or not self.code_lines[index]:
+            return None
+        return self.code_lines[index] + py_line - self.py_lines[index]
+
+
+def _key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def register(py_file, code_file, line_map, install_hook=True):
+    """注册一个生成文件的映射; code_file 为相对路径时相对于 py_file 所在目录解析"""
+    if py_file.endswith('.pyc'):
+        # 直接运行同目录的 .pyc 时 __file__ 是 .pyc, 而帧中的文件名是编译时的 .py
+        py_file = py_file[:-1]
+    if code_file is None:
+        code_file = os.path.splitext(py_file)[0] + '.code'
+    elif not os.path.isabs(code_file):
+        candidate = os.path.join(os.path.dirname(os.path.abspath(py_file)), code_file)
+        if os.path.exists(candidate):
+            code_file = os.path.normpath(candidate)
+    source_map = SourceMap(py_file, code_file, line_map)
+    _registry[_key(py_file)] = source_map
+    archive = os.path.dirname(py_file)
+    if os.path.isfile(archive):
+        # zipapp 中预编译的字节码以归档内的相对路径作为文件名
+        _registry[os.path.relpath(py_file, archive)] = source_map
+    if install_hook:
+        install()
+
+
+def load(py_file):
+    """不执行生成文件, 直接读取其中嵌入的映射表并注册; 成功返回 True"""
+    values = {}
+    with open(py_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith(SOURCE_VAR + ' = '):
+                values[SOURCE_VAR] = ast.literal_eval(line[len(SOURCE_VAR) + 3:])
+            elif line.rstrip() == LINE_MAP_VAR + ' = (':
+                # 每行一个只含数字、冒号和空格的字符串字面量, 直到 '')
+                chunks = []
+                for line in f:
+                    line = line.strip()
+                    chunks.append(line.rstrip(')').strip("'"))
+                    if line.endswith(')'):
+                        break
+                values[LINE_MAP_VAR] = ''.join(chunks)
+    if LINE_MAP_VAR not in values:
+        return False
+    register(py_file, values.get(SOURCE_VAR), values[LINE_MAP_VAR], install_hook=False)
+    return True
+
+
+def map_location(filename, lineno):
+    """把 (文件, 行号) 映射到 .code 位置; 无映射时原样返回"""
+    source_map = (_registry.get(filename) or _registry.get(_key(filename))) if filename else None
+    if source_map is None or lineno is None:
+        return filename, lineno
+    code_line = source_map.lookup(lineno)
+    if code_line is None:
+        return filename, lineno
+    return source_map.code_file, code_line
+
+
+def _rewrite_stack(stack):
+    """改写 StackSummary 中属于生成文件的帧"""
+    for index, frame in enumerate(stack):
+        filename, lineno = map_location(frame.filename, frame.lineno)
+        if filename is frame.filename:
+            continue
+        line = linecache.getline(filename, lineno).strip() or None
+        stack[index] = traceback.FrameSummary(filename, lineno, frame.name, lookup_line=False, line=line)
+
+
+def _rewrite_exception(te, seen=None):
+    seen = seen if seen is not None else set()
+    if id(te) in seen:
+        return
+    seen.add(id(te))
+    _rewrite_stack(te.stack)
+    for chained in (te.__cause__, te.__context__):
+        if chained is not None:
+            _rewrite_exception(chained, seen)
+
+
+def format_exception(exc_type, exc, tb):
+    """与 traceback.format_exception 相同, 但生成代码的位置改写为 .code 位置"""
+    te = traceback.TracebackException(exc_type, exc, tb)
+    _rewrite_exception(te)
+    return list(te.format())
+
+
+def excepthook(exc_type, exc, tb):
+    sys.stderr.write(''.join(format_exception(exc_type, exc, tb)))
+
+
+def _threading_excepthook(args):
+    if args.exc_type is SystemExit:
+        return
+    name = args.thread.name if args.thread is not None else '?'
+    sys.stderr.write(f"Exception in thread {name}:\n")
+    excepthook(args.exc_type, args.exc_value, args.exc_traceback)
+
+
+def _report_callback_exception(self, exc_type, exc, tb):
+    sys.stderr.write("Exception in Tkinter callback\n")
+    excepthook(exc_type, exc, tb)
+
+
+def install():
+    """安装异常钩子: 主线程、其它线程和 Tkinter 回调中的未捕获异常都按 .code 位置显示
+
+    按钩子当前的值判断, 不记录是否已安装: 钩子被恢复为默认值 (如 console 运行完一个程序后)
+    或 tkinter 被重新导入时再次安装; 程序自己设置的钩子保持不变。
+    """
+    if sys.excepthook is sys.__excepthook__:
+        sys.excepthook = excepthook
+    threading = sys.modules.get('threading')
+    if threading is not None and getattr(threading, 'excepthook', None) is getattr(threading, '__excepthook__', 0):
+        threading.excepthook = _threading_excepthook
+    tkinter = sys.modules.get('tkinter')
+    if tkinter is not None and tkinter.Tk.report_callback_exception is not _report_callback_exception:
+        tkinter.Tk.report_callback_exception = _report_callback_exception
+
+
+def rewrite_stats(stats):
+    """把 pstats.Stats 中生成代码的函数位置改写为 .code 位置, 返回 stats 本身"""
+    import pstats
+
+    def remap(func):
+        filename, lineno, name = func
+        filename, lineno = map_location(filename, lineno)
+        return filename, lineno, name
+
+    new_stats = {}
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        new_callers = {}
+        for caller, value in callers.items():
+            caller = remap(caller)
+            if caller in new_callers:
+                new_callers = pstats.add_callers(new_callers, {caller: value})
+            else:
+                new_callers[caller] = value
+        entry = (cc, nc, tt, ct, new_callers)
+        func = remap(func)
+        new_stats[func] = pstats.add_func_stats(new_stats[func], entry) if func in new_stats else entry
+    stats.stats = new_stats
+    stats.fcn_list = None
+    return stats
+
+
+def main(argv=None):
+    """命令行: python code_sourcemap.py 生成文件.py 性能分析文件 [排序键] [行数]"""
+    import pstats
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2:
+        print('用法: python code_sourcemap.py 生成文件.py 性能分析文件 [排序键] [行数]')
+        return 1
+    if not load(argv[0]):
+        print(f"错误: {argv[0]} 中没有源码映射表")
+        return 1
+    stats = rewrite_stats(pstats.Stats(argv[1]))
+    stats.sort_stats(argv[2] if len(argv) > 2 else 'cumulative')
+    stats.print_stats(int(argv[3]) if len(argv) > 3 else 30)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
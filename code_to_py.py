@@ -8,23 +8,130 @@ Python++ Code to Python Converter
 import os
 import sys
 import re
+import json
+import time
+import io
+import hashlib
+import contextlib
 import argparse
+import tempfile
+import subprocess
+import py_compile
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import code_parser
+import code_sourcemap
+import code_optimizer
+
+# 转换器版本, 转换逻辑变化时需递增, 使增量清单中的旧记录失效
+CONVERTER_VERSION = '3.6'
+# 增量转换清单文件名, 保存在输出目录中
+MANIFEST_NAME = '.code_to_py_manifest.json'
+# 生成的程序运行时依赖的模块, 转换时复制到输出目录
+RUNTIME_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNTIME_MODULES = ('code_runtime.py', 'code_sourcemap.py')
+# 预编译字节码的失效检查方式; 基于哈希的模式不含时间戳, 同样的源码总是得到同样的 .pyc
+PYC_MODES = {
+    'timestamp': py_compile.PycInvalidationMode.TIMESTAMP,
+    'checked-hash': py_compile.PycInvalidationMode.CHECKED_HASH,
+    'unchecked-hash': py_compile.PycInvalidationMode.UNCHECKED_HASH,
+}
+
+# 转换结果缓存目录的环境变量; 未设置时为用户缓存目录下的 pypp, 设为空字符串时禁用缓存
+CACHE_DIR_VAR = 'PYPP_CACHE_DIR'
+# 转换结果缓存的容量上限和最长保留时间; 超出时按最近使用时间淘汰
+CONVERT_CACHE_MAX_BYTES = 512 * 1024 ** 2
+CONVERT_CACHE_MAX_AGE = 30 * 24 * 3600
+# 两次淘汰检查的最短间隔 (秒); 淘汰需要遍历整个缓存, 不在每次写入时进行
+CONVERT_CACHE_EVICT_INTERVAL = 3600
+# 缓存中的生成代码不含 .code 路径 (同样的内容可能来自不同位置), 该行写为占位值, 取出时替换
+_CACHED_SOURCE_LINE = f"{code_sourcemap.SOURCE_VAR} = ''\n".encode('utf-8')
+
+# mkstemp 创建的文件权限为 0600, 原子写入后按 umask 恢复普通文件权限
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# .code 事件名到 Tk 事件序列的映射, 未列出的事件名原样使用
+EVENT_MAP = {
+    'click': 'Button-1',
+    'double': 'Double-Button-1',
+    'right': 'Button-3',
+    'key': 'Key',
+    'enter': 'Return',
+    'focus': 'FocusIn',
+    'blur': 'FocusOut'
+}
+
+# 监视目录时完整重新遍历的最长间隔 (秒); 其间只 stat 已知的文件和目录
+WATCH_RESCAN_INTERVAL = 5.0
+# main() 中引用控件的局部变量名前缀; 不直接使用控件名, 以免与 gui、time 等生成代码用到的名称
+# 或程序自己的函数、变量 (可能在后面才出现, 流式转换时无法预知) 同名而互相遮蔽
+CONTROL_VAR_PREFIX = '_w_'
+# 可以合并进同一次 configure 调用的属性值类型 (求值没有副作用)
+FOLDABLE_VALUES = ('string', 'number', 'name')
+
+def control_var(name):
+    """main() 中引用控件 name 的局部变量名"""
+    return CONTROL_VAR_PREFIX + name
+
+class PropertyBatch(code_parser.Node):
+    """连续设置同一控件多个属性的语句, 转换为一次 configure 调用"""
+    __slots__ = ('control', 'items')
+    fields = ('control', 'items')
+    
+    def __init__(self, first):
+        self.line, self.col, self.text = first.line, first.col, first.text
+        self.control = first.control
+        self.items = [first]
+
 class CodeToPythonConverter:
-    def __init__(self):
+    def __init__(self, prune=False):
+        # prune 为 True 时先解析完整程序并删除无效语句 (见 code_optimizer), 不再流式解析
+        self.prune = prune
+        self.removals = []
         self.indent_level = 0
         self.in_function = False
         self.function_name = ""
         self.function_params = []
+        # main() 中以局部变量 (见 control_var) 引用的控件 {控件名: 控件类型}
+        self.controls = {}
+        # 程序中用 show 打开的窗口, 运行时延迟创建
+        self.shown_windows = set()
         
     def convert_code_to_python(self, code_content):
         """将 .code 内容转换为 Python 代码"""
-        lines = code_content.split('\n')
-        python_lines = []
+        return ''.join(line + '\n' for line in self.iter_python_lines(io.StringIO(code_content)))
+    
+    def convert_stream(self, source_lines, output, filename=None, source_name=None):
+        """流式转换: 逐行读取源码, 逐行写入 output (文本文件对象), 内存占用与文件大小无关"""
+        batch = []
+        for python_line in self.iter_python_lines(source_lines, filename, source_name):
+            batch.append(python_line)
+            if len(batch) >= 1024:
+                batch.append('')
+                output.write('\n'.join(batch))
+                batch = []
+        if batch:
+            batch.append('')
+            output.write('\n'.join(batch))
+    
+    def iter_python_lines(self, source_lines, filename=None, source_name=None):
+        """惰性转换生成器: 逐条解析 .code 顶层语句并产出对应的 Python 代码行
+        
+        生成代码末尾嵌入源码映射表 (见 code_sourcemap), source_name 为表中记录的 .code 路径,
+        默认取 filename 的文件名。
+        """
+        if source_name is None and filename is not None:
+            source_name = os.path.basename(filename)
+        self.line_map = code_sourcemap.LineMapBuilder()
+        self.controls = {}
+        self.shown_windows = set()
+        self.in_function = False
         
         # 添加必要的导入
-        python_lines.extend([
+        header = [
             "#!/usr/bin/env python3",
             "# -*- coding: utf-8 -*-",
             "",
@@ -33,382 +140,480 @@ class CodeToPythonConverter:
             "import threading",
             "import time",
             "",
-            "# GUI 控制管理器",
-            "class GUIControlManager:",
-            "    def __init__(self):",
-            "        self.controls = {}",
-            "        self.windows = {}",
-            "        self.root = None",
-            "",
-            "    def create_window(self, name, title, width=800, height=600):",
-            "        if name not in self.windows:",
-            "            window = tk.Tk() if self.root is None else tk.Toplevel(self.root)",
-            "            if self.root is None:",
-            "                self.root = window",
-            "            window.title(title)",
-            "            window.geometry(f'{width}x{height}')",
-            "            self.windows[name] = window",
-            "        return self.windows[name]",
-            "",
-            "    def create_control(self, control_type, name, parent='main', **kwargs):",
-            "        if parent not in self.windows:",
-            "            parent = 'main'",
-            "        parent_window = self.windows[parent]",
-            "        ",
-            "        if control_type == 'button':",
-            "            control = tk.Button(parent_window, **kwargs)",
-            "        elif control_type == 'label':",
-            "            control = tk.Label(parent_window, **kwargs)",
-            "        elif control_type == 'entry':",
-            "            control = tk.Entry(parent_window, **kwargs)",
-            "        elif control_type == 'text':",
-            "            control = tk.Text(parent_window, **kwargs)",
-            "        elif control_type == 'listbox':",
-            "            control = tk.Listbox(parent_window, **kwargs)",
-            "        elif control_type == 'combobox':",
-            "            control = ttk.Combobox(parent_window, **kwargs)",
-            "        elif control_type == 'checkbox':",
-            "            control = tk.Checkbutton(parent_window, **kwargs)",
-            "        elif control_type == 'radiobutton':",
-            "            control = tk.Radiobutton(parent_window, **kwargs)",
-            "        elif control_type == 'image':",
-            "            control = tk.Label(parent_window, **kwargs)",
-            "        else:",
-            "            control = tk.Label(parent_window, text=f'Unknown control: {control_type}')",
-            "        ",
-            "        self.controls[name] = control",
-            "        return control",
-            "",
-            "    def set_property(self, control_name, property_name, value):",
-            "        if control_name in self.controls:",
-            "            control = self.controls[control_name]",
-            "            if hasattr(control, property_name):",
-            "                setattr(control, property_name, value)",
-            "",
-            "    def get_property(self, control_name, property_name):",
-            "        if control_name in self.controls:",
-            "            control = self.controls[control_name]",
-            "            if hasattr(control, property_name):",
-            "                return getattr(control, property_name)",
-            "        return None",
-            "",
-            "    def bind_event(self, control_name, event, handler):",
-            "        if control_name in self.controls:",
-            "            control = self.controls[control_name]",
-            "            control.bind(event, handler)",
-            "",
-            "    def layout(self, control_name, method='pack', **kwargs):",
-            "        if control_name in self.controls:",
-            "            control = self.controls[control_name]",
-            "            if method == 'pack':",
-            "                control.pack(**kwargs)",
-            "            elif method == 'grid':",
-            "                control.grid(**kwargs)",
-            "            elif method == 'place':",
-            "                control.place(**kwargs)",
-            "",
-            "    def remove_control(self, control_name):",
-            "        if control_name in self.controls:",
-            "            control = self.controls[control_name]",
-            "            control.destroy()",
-            "            del self.controls[control_name]",
-            "",
-            "    def show_message(self, title, message, message_type='info'):",
-            "        if message_type == 'info':",
-            "            messagebox.showinfo(title, message)",
-            "        elif message_type == 'warning':",
-            "            messagebox.showwarning(title, message)",
-            "        elif message_type == 'error':",
-            "            messagebox.showerror(title, message)",
-            "        elif message_type == 'question':",
-            "            return messagebox.askyesno(title, message)",
-            "",
-            "    def show_input_dialog(self, title, prompt):",
-            "        return simpledialog.askstring(title, prompt)",
-            "",
-            "    def show_file_dialog(self, title, file_types):",
-            "        return filedialog.askopenfilename(title=title, filetypes=file_types)",
-            "",
-            "    def run(self):",
-            "        if self.root:",
-            "            self.root.mainloop()",
+            "# GUI 控制管理器 (共享运行时模块, 见 code_runtime.py)",
+            "from code_runtime import GUIControlManager",
             "",
             "# 全局 GUI 管理器",
             "gui = GUIControlManager()",
             "",
             "# 主程序开始",
             "def main():",
-        ])
+        ]
+        yield from header
         
         self.indent_level = 1
-        in_function = False
-        function_name = ""
-        function_body = []
+        line_number = len(header)
+        add_mapping = self.line_map.add
         
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            # 处理函数定义
-            if line.startswith('function '):
-                if in_function:
-                    # 结束前一个函数
-                    python_lines.append('    ' * self.indent_level + f"def {function_name}():")
-                    for body_line in function_body:
-                        python_lines.append('    ' * (self.indent_level + 1) + body_line)
-                    python_lines.append('')
-                
-                # 开始新函数
-                parts = line.split()
-                function_name = parts[1]
-                in_function = True
-                function_body = []
-                continue
-            
-            # 如果在函数内部
-            if in_function:
-                # 检查是否是函数结束（空行或新的函数定义）
-                if not line or line.startswith('function '):
-                    # 结束当前函数
-                    python_lines.append('    ' * self.indent_level + f"def {function_name}():")
-                    for body_line in function_body:
-                        python_lines.append('    ' * (self.indent_level + 1) + body_line)
-                    python_lines.append('')
-                    
-                    if line.startswith('function '):
-                        # 开始新函数
-                        parts = line.split()
-                        function_name = parts[1]
-                        function_body = []
-                    else:
-                        in_function = False
-                        function_name = ""
-                        function_body = []
-                else:
-                    python_line = self.convert_line(line)
-                    if python_line:
-                        function_body.append(python_line)
-                continue
-            
-            # 普通代码行
-            python_line = self.convert_line(line)
-            if python_line:
-                python_lines.append('    ' * self.indent_level + python_line)
+        if self.prune:
+            program = code_parser.parse(source_lines, filename)
+            self.removals = code_optimizer.prune(program)
+            nodes = program.body
+        else:
+            nodes = code_parser.iter_parse(source_lines, filename)
+        for node in self.fold_properties(nodes):
+            for code_line, python_line in self.emit_node(node, self.indent_level):
+                line_number += 1
+                add_mapping(line_number, code_line)
+                yield python_line
+        if line_number == len(header):
+            yield '    ' * self.indent_level + "pass"
+            line_number += 1
+        add_mapping(line_number + 1, 0)
         
-        # 处理最后一个函数
-        if in_function and function_body:
-            python_lines.append('    ' * self.indent_level + f"def {function_name}():")
-            for body_line in function_body:
-                python_lines.append('    ' * (self.indent_level + 1) + body_line)
-            python_lines.append('')
+        yield ""
+        if self.shown_windows:
+            # 在 main() 之前执行: 这些窗口的控件在第一次 show 时才创建
+            yield f"gui.set_lazy_windows({sorted(self.shown_windows)!r})"
+            yield ""
+        yield from self.line_map.table_lines(source_name)
         
         # 添加主程序调用
-        python_lines.extend([
+        yield from [
             "",
             "if __name__ == '__main__':",
             "    main()",
             "    gui.run()",
-        ])
-        
-        return '\n'.join(python_lines)
+        ]
     
-    def convert_line(self, line):
-        """转换单行代码"""
-        # 窗口创建
-        if line.startswith('window '):
-            return self.convert_window_creation(line)
-        
-        # 控件创建
-        elif line.startswith(('button ', 'label ', 'entry ', 'text ', 'listbox ', 
-                             'combobox ', 'checkbox ', 'radiobutton ', 'image ')):
-            return self.convert_control_creation(line)
-        
-        # 属性设置
-        elif '=' in line and '.' in line:
-            return self.convert_property_setting(line)
-        
-        # 事件绑定
-        elif line.startswith('bind '):
-            return self.convert_event_binding(line)
-        
-        # 布局
-        elif line.startswith(('pack ', 'grid ', 'place ')):
-            return self.convert_layout(line)
+    def emit_node(self, node, depth):
+        """把一个 AST 节点 (含其语句体) 转换为缩进好的 Python 代码行, 产出 (.code 行号, 代码行)"""
+        if isinstance(node, code_parser.Suite):
+            # 意外缩进的语句按所在层级展开
+            for child in node.body:
+                yield from self.emit_node(child, depth)
+            return
         
-        # 函数定义
-        elif line.startswith('function '):
-            return self.convert_function_definition(line)
+        python_line = self.convert_node(node)
+        if not python_line:
+            return
+        yield node.line, '    ' * depth + python_line
         
-        # 函数调用
-        elif '(' in line and line.endswith(')'):
-            return self.convert_function_call(line)
-        
-        # 变量赋值
-        elif '=' in line and not line.startswith(('if ', 'for ', 'while ')):
-            return self.convert_assignment(line)
-        
-        # 条件语句
-        elif line.startswith('if '):
-            return self.convert_if_statement(line)
-        
-        # 循环语句
-        elif line.startswith(('for ', 'while ')):
-            return self.convert_loop_statement(line)
+        if isinstance(node, (code_parser.Function, code_parser.Block)):
+            has_body = False
+            outer_in_function = self.in_function
+            self.in_function = outer_in_function or isinstance(node, code_parser.Function)
+            for body_line in self.emit_body(node.body, depth + 1):
+                has_body = True
+                yield body_line
+            self.in_function = outer_in_function
+            if not has_body:
+                yield node.line, '    ' * (depth + 1) + "pass"
+            if isinstance(node, code_parser.Function):
+                yield 0, ''
+    
+    def emit_body(self, body, depth):
+        """转换语句体中的各条语句"""
+        for child in self.fold_properties(body):
+            yield from self.emit_node(child, depth)
+    
+    def fold_properties(self, nodes):
+        """把连续设置同一控件不同属性的语句合并为 PropertyBatch
         
-        # 其他语句
-        else:
-            return line
+        只合并已知控件且值为字面量或名称的设置, 合并后求值顺序和结果不变。
+        控件在语句产出后才登记, 因此本生成器必须与 emit_node 交替推进。
+        """
+        batch = None
+        for node in nodes:
+            if batch is not None:
+                if (isinstance(node, code_parser.PropertySet) and node.control == batch.control
+                        and node.value.kind in FOLDABLE_VALUES
+                        and all(item.prop != node.prop for item in batch.items)):
+                    batch.items.append(node)
+                    continue
+                yield batch.items[0] if len(batch.items) == 1 else batch
+                batch = None
+            if (isinstance(node, code_parser.PropertySet) and node.control in self.controls
+                    and node.value.kind in FOLDABLE_VALUES):
+                batch = PropertyBatch(node)
+                continue
+            yield node
+        if batch is not None:
+            yield batch.items[0] if len(batch.items) == 1 else batch
+    
+    def convert_line(self, line):
+        """转换单行代码"""
+        node = code_parser.parse_line(line)
+        if node is None:
+            return None
+        return self.convert_node(node)
+    
+    def convert_node(self, node):
+        """按节点类型转换单条语句 (不含语句体)"""
+        converter = getattr(self, self.NODE_CONVERTERS[type(node)])
+        return converter(node)
     
-    def convert_window_creation(self, line):
+    def convert_window_creation(self, node):
         """转换窗口创建"""
         # window main "My App" 800 600
-        parts = line.split()
-        if len(parts) >= 3:
-            name = parts[1]
-            title = parts[2].strip('"')
-            width = parts[3] if len(parts) > 3 else '800'
-            height = parts[4] if len(parts) > 4 else '600'
-            return f"gui.create_window('{name}', '{title}', {width}, {height})"
-        return None
+        width = node.width.as_python() if node.width else '800'
+        height = node.height.as_python() if node.height else '600'
+        # close=hide|destroy: 关闭窗口时隐藏 (再次显示时复用) 或销毁 (再次显示时重建)
+        close = ''.join(f", close={value.text!r}" for key, value in node.options if key == 'close')
+        return f"gui.create_window({node.name!r}, {node.title.text!r}, {width}, {height}{close})"
     
-    def convert_control_creation(self, line):
+    def convert_window_action(self, node):
+        """转换窗口显示/隐藏"""
+        # show settings / hide settings
+        if node.action == 'show':
+            self.shown_windows.add(node.window)
+        return f"gui.{node.action}_window({node.window!r})"
+    
+    def convert_control_creation(self, node):
         """转换控件创建"""
         # button btn1 "Click Me" text="Hello" command=onclick
-        parts = line.split()
-        control_type = parts[0]
-        name = parts[1]
-        
-        # 提取参数
-        params = {}
-        text_param = None
+        params = {key: value.text for key, value in node.options}
         
-        for part in parts[2:]:
-            if '=' in part:
-                key, value = part.split('=', 1)
-                if value.startswith('"') and value.endswith('"'):
-                    value = value[1:-1]
-                params[key] = value
-            else:
-                # 第一个非名称参数通常是文本
-                if text_param is None:
-                    text_param = part.strip('"')
-        
-        # 设置文本参数
-        if text_param:
-            params['text'] = text_param
+        # 第一个非名称参数是文本
+        if node.label and node.label.text:
+            params['text'] = node.label.text
         
         # 构建参数字符串
         if params:
-            param_str = ", ".join([f"{k}='{v}'" for k, v in params.items()])
-            return f"gui.create_control('{control_type}', '{name}', {param_str})"
+            param_str = ", ".join([f"{k}={v!r}" for k, v in params.items()])
+            call = f"gui.create_control({node.control_type!r}, {node.name!r}, {param_str})"
         else:
-            return f"gui.create_control('{control_type}', '{name}')"
+            call = f"gui.create_control({node.control_type!r}, {node.name!r})"
+        
+        # main() 中创建的控件同时绑定到局部变量 _w_<控件名>, 之后的语句 (包括内嵌的事件处理函数) 直接引用
+        if self.in_function or not node.name.isidentifier():
+            self.controls.pop(node.name, None)
+            return call
+        self.controls[node.name] = node.control_type
+        return f"{control_var(node.name)} = {call}"
     
-    def convert_property_setting(self, line):
+    def convert_property_setting(self, node):
         """转换属性设置"""
         # btn1.text = "New Text"
-        parts = line.split('=')
-        if len(parts) == 2:
-            control_prop = parts[0].strip()
-            value = parts[1].strip()
-            
-            if '.' in control_prop:
-                control_name, prop_name = control_prop.split('.', 1)
-                if value.startswith('"') and value.endswith('"'):
-                    value = f"'{value[1:-1]}'"
-                return f"gui.set_property('{control_name}', '{prop_name}', {value})"
-        return None
+        if node.control in self.controls:
+            return f"gui.configure({control_var(node.control)}, {node.prop}={node.value.as_python()})"
+        return f"gui.set_property({node.control!r}, {node.prop!r}, {node.value.as_python()})"
+    
+    def convert_property_batch(self, node):
+        """转换同一控件的连续属性设置"""
+        # btn1.text = "OK" / btn1.fg = "red" -> gui.configure(_w_btn1, text='OK', fg='red')
+        params = ", ".join(f"{item.prop}={item.value.as_python()}" for item in node.items)
+        return f"gui.configure({control_var(node.control)}, {params})"
     
-    def convert_event_binding(self, line):
+    def convert_event_binding(self, node):
         """转换事件绑定"""
         # bind btn1 click onclick
-        parts = line.split()
-        if len(parts) >= 4:
-            control_name = parts[1]
-            event = parts[2]
-            handler = parts[3]
-            
-            # 事件名称映射
-            event_map = {
-                'click': 'Button-1',
-                'double': 'Double-Button-1',
-                'right': 'Button-3',
-                'key': 'Key',
-                'enter': 'Return',
-                'focus': 'FocusIn',
-                'blur': 'FocusOut'
-            }
-            
-            tk_event = event_map.get(event, f'<{event}>')
-            return f"gui.bind_event('{control_name}', '{tk_event}', {handler})"
-        return None
+        tk_event = EVENT_MAP.get(node.event, node.event)
+        if node.control in self.controls:
+            return f"{control_var(node.control)}.bind('<{tk_event}>', {node.handler})"
+        return f"gui.bind_event({node.control!r}, '<{tk_event}>', {node.handler})"
     
-    def convert_layout(self, line):
+    def convert_layout(self, node):
         """转换布局"""
         # pack btn1 side=left fill=x
-        parts = line.split()
-        method = parts[0]
-        control_name = parts[1]
-        
-        params = {}
-        for part in parts[2:]:
-            if '=' in part:
-                key, value = part.split('=', 1)
-                params[key] = value
-        
-        param_str = ", ".join([f"{k}='{v}'" for k, v in params.items()])
-        return f"gui.layout('{control_name}', '{method}', {param_str})"
+        params = [f"{key}={value.text!r}" for key, value in node.options]
+        if node.control in self.controls:
+            return f"{control_var(node.control)}.{node.method}({', '.join(params)})"
+        return f"gui.layout({node.control!r}, {node.method!r}{''.join(', ' + p for p in params)})"
     
-    def convert_function_definition(self, line):
+    def convert_function_definition(self, node):
         """转换函数定义"""
-        # function onclick
-        parts = line.split()
-        if len(parts) >= 2:
-            func_name = parts[1]
-            self.in_function = True
-            self.function_name = func_name
-            self.function_params = []
-            return f"def {func_name}():"
-        return None
+        # function onclick; 事件回调会传入 event 参数, 直接调用时为 None
+        return f"def {node.name}(event=None):"
     
-    def convert_function_call(self, line):
+    def convert_function_call(self, node):
         """转换函数调用"""
         # onclick()
-        if line.endswith('()'):
-            func_name = line[:-2]
-            return f"{func_name}()"
-        return line
+        return node.text
     
-    def convert_assignment(self, line):
+    def convert_assignment(self, node):
         """转换变量赋值"""
         # x = 10
-        return line
+        return node.text
+    
+    def convert_block_header(self, node):
+        """转换条件/循环等语句块的头部"""
+        # if x > 10 / for i in range(10)
+        return node.header + ':'
     
-    def convert_if_statement(self, line):
-        """转换条件语句"""
-        # if x > 10
-        return line + ':'
+    def convert_statement(self, node):
+        """其他语句原样保留"""
+        return node.text
     
-    def convert_loop_statement(self, line):
-        """转换循环语句"""
-        # for i in range(10)
-        return line + ':'
+    NODE_CONVERTERS = {
+        code_parser.Window: 'convert_window_creation',
+        code_parser.WindowAction: 'convert_window_action',
+        code_parser.Control: 'convert_control_creation',
+        code_parser.PropertySet: 'convert_property_setting',
+        PropertyBatch: 'convert_property_batch',
+        code_parser.Bind: 'convert_event_binding',
+        code_parser.Layout: 'convert_layout',
+        code_parser.Function: 'convert_function_definition',
+        code_parser.Call: 'convert_function_call',
+        code_parser.Assign: 'convert_assignment',
+        code_parser.Block: 'convert_block_header',
+        code_parser.Expr: 'convert_statement',
+    }
 
-def convert_file(input_file, output_file=None):
-    """转换单个文件"""
+def _hash_file(path):
+    """计算文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+@contextlib.contextmanager
+def _atomic_open(path):
+    """原子写入: 先写同目录临时文件再替换, 中途失败不会留下半截输出"""
+    path = Path(path)
+    fd, temp_name = tempfile.mkstemp(prefix=f".{path.name}.", suffix='.tmp', dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+        os.chmod(temp_name, 0o666 & ~_UMASK)
+        os.replace(temp_name, path)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+
+def _atomic_write(path, data):
+    """原子写入整块数据"""
+    with _atomic_open(path) as f:
+        f.write(data)
+
+class _HashingReader:
+    """逐行读取二进制文件并解码, 同时计算原始字节的哈希"""
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+    
+    def __iter__(self):
+        update = self.digest.update
+        for raw_line in self.f:
+            update(raw_line)
+            yield raw_line.decode('utf-8')
+
+class _HashingWriter:
+    """按文本写入, 编码后写到二进制文件并同时计算哈希"""
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+    
+    def write(self, text):
+        data = text.encode('utf-8')
+        self.digest.update(data)
+        self.f.write(data)
+
+def cache_dir():
+    """转换结果缓存的根目录; 禁用缓存时返回 None"""
+    path = os.environ.get(CACHE_DIR_VAR)
+    if path is None:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        path = os.path.join(base, 'pypp')
+    return path or None
+
+def _cache_entry(root, source_hash, prune):
+    """缓存条目路径 (不含扩展名); 键为源码哈希、转换器版本和优化选项"""
+    key = hashlib.sha256(f"{source_hash}:{CONVERTER_VERSION}:{int(prune)}".encode('ascii')).hexdigest()
+    return os.path.join(root, 'convert', key[:2], key)
+
+def _convert_stream_to(input_file, output_file, prune, source_name):
+    """流式转换并写出单个文件, 返回 (源文件哈希, 输出文件哈希, 优化删除的语句列表)"""
+    converter = CodeToPythonConverter(prune)
+    with open(input_file, 'rb') as src, _atomic_open(output_file) as dst:
+        reader = _HashingReader(src)
+        writer = _HashingWriter(dst)
+        converter.convert_stream(reader, writer, input_file, source_name)
+    return reader.digest.hexdigest(), writer.digest.hexdigest(), converter.removals
+
+def _copy_cached(cached_file, output_file, source_name):
+    """把缓存的生成代码复制到 output_file 并填入 .code 路径, 返回输出文件哈希"""
+    source_line = f"{code_sourcemap.SOURCE_VAR} = {source_name!r}\n".encode('utf-8')
+    with open(cached_file, 'rb') as src, _atomic_open(output_file) as dst:
+        writer = _HashingWriter(dst)
+        for line in src:
+            # 用户代码都在 main() 中, 有缩进, 顶格的占位行只有映射表中的一行
+            if line == _CACHED_SOURCE_LINE:
+                line = source_line
+            writer.digest.update(line)
+            dst.write(line)
+    return writer.digest.hexdigest()
+
+def convert_to(input_file, output_file, prune=False):
+    """转换并写出单个文件, 返回 (源文件哈希, 输出文件哈希, 优化删除的语句列表)
+    
+    code_to_py、console、code_daemon 和 standalone_code_to_exe 共用的转换入口。结果按内容
+    缓存在 cache_dir() 中, 同样的源码 (不论路径) 只转换一次, 之后直接从缓存复制;
+    缓存目录不可用 (只读、路径被文件占用等) 时直接转换到 output_file。
+    """
+    source_name = os.path.relpath(input_file, os.path.dirname(os.path.abspath(output_file)))
+    root = cache_dir()
+    if root is not None:
+        try:
+            return _convert_cached(root, input_file, output_file, prune, source_name)
+        except OSError:
+            # 缓存只是加速手段, 出错时不缓存; 输入输出本身的错误由下面的直接转换报告
+            pass
+    return _convert_stream_to(input_file, output_file, prune, source_name)
+
+def _convert_cached(root, input_file, output_file, prune, source_name):
+    """经缓存转换单个文件, 返回值同 convert_to; 缓存目录出错时抛出 OSError"""
+    entry = _cache_entry(root, _hash_file(input_file), prune)
+    try:
+        with open(entry + '.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        output_hash = _copy_cached(entry + '.py', output_file, source_name)
+        removals = [code_optimizer.Removal(*item) for item in meta['removals']]
+        # 修改时间记录最近一次使用, 淘汰时按它排序
+        os.utime(entry + '.py')
+        return meta['source_hash'], output_hash, removals
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    # 未命中: 转换到缓存目录, 按实际读到的内容 (转换期间文件可能被修改) 登记后再复制
+    os.makedirs(os.path.dirname(entry), exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(suffix='.py', dir=os.path.dirname(entry))
+    os.close(fd)
+    try:
+        source_hash, _, removals = _convert_stream_to(input_file, temp_name, prune, '')
+        entry = _cache_entry(root, source_hash, prune)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        os.replace(temp_name, entry + '.py')
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+    meta = {'source_hash': source_hash, 'converter_version': CONVERTER_VERSION,
+            'removals': [list(removal) for removal in removals]}
+    _atomic_write(entry + '.json', json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+    _maybe_evict(root)
+    return source_hash, _copy_cached(entry + '.py', output_file, source_name), removals
+
+def _maybe_evict(root):
+    """距上次淘汰检查超过 CONVERT_CACHE_EVICT_INTERVAL 秒时执行一次 evict_convert_cache"""
+    marker = os.path.join(root, 'convert', '.last_evict')
+    try:
+        if time.time() - os.stat(marker).st_mtime < CONVERT_CACHE_EVICT_INTERVAL:
+            return
+    except FileNotFoundError:
+        pass
+    with open(marker, 'wb'):
+        pass
+    evict_convert_cache(root)
+
+def evict_convert_cache(root, max_bytes=CONVERT_CACHE_MAX_BYTES, max_age=CONVERT_CACHE_MAX_AGE):
+    """删除超过 max_age 秒未使用的转换结果, 总大小仍超过 max_bytes 时从最久未使用的开始删除"""
+    now = time.time()
+    entries = []
+    for dirpath, _, filenames in os.walk(os.path.join(root, 'convert')):
+        for name in filenames:
+            if not name.endswith('.py'):
+                continue
+            entry = os.path.join(dirpath, name[:-3])
+            try:
+                info = os.stat(entry + '.py')
+            except OSError:
+                continue
+            try:
+                size = info.st_size + os.path.getsize(entry + '.json')
+            except OSError:
+                size = info.st_size
+            entries.append((info.st_mtime, size, entry))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, entry in entries:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        for suffix in ('.json', '.py'):
+            try:
+                os.remove(entry + suffix)
+            except OSError:
+                pass
+        total -= size
+
+def install_runtime(output_dir, optimize=0):
+    """把运行时模块复制到输出目录并预编译为 __pycache__ 中的字节码; 已是最新时不做任何事
+    
+    optimize 不为 0 时同时生成对应优化级别 (python -O/-OO 运行时使用) 的字节码。
+    """
+    for name in RUNTIME_MODULES:
+        source = os.path.join(RUNTIME_DIR, name)
+        target = os.path.join(output_dir, name)
+        with open(source, 'rb') as f:
+            data = f.read()
+        try:
+            with open(target, 'rb') as f:
+                changed = f.read() != data
+        except OSError:
+            changed = True
+        if changed:
+            _atomic_write(target, data)
+        for level in sorted({0, optimize}):
+            cfile = pyc_path(target, level)
+            if changed or not os.path.exists(cfile):
+                py_compile.compile(target, cfile=cfile, doraise=True, optimize=level)
+
+def pyc_path(py_file, optimize=0, sibling=False):
+    """字节码文件路径: __pycache__ 中按解释器和优化级别命名的文件, 或 sibling 时同目录的 .pyc"""
+    if sibling:
+        return os.path.splitext(py_file)[0] + '.pyc'
+    return importlib.util.cache_from_source(py_file, optimization='' if optimize == 0 else optimize)
+
+def compile_output(py_file, optimize=0, mode='timestamp', sibling=False):
+    """立即把生成的 .py 编译为 .pyc, 返回 .pyc 路径
+    
+    __pycache__ 中的字节码在程序被导入时使用, 只读目录中也不必重新编译;
+    sibling 模式生成的 app.pyc 可以直接运行 (python app.pyc), 跳过入口脚本的编译。
+    """
+    cfile = pyc_path(py_file, optimize, sibling)
+    py_compile.compile(py_file, cfile=cfile, doraise=True, optimize=optimize, invalidation_mode=PYC_MODES[mode])
+    return cfile
+
+def _pyc_key(compile_options):
+    """清单中记录的编译选项, 选项变化时需要重新编译"""
+    return [compile_options['optimize'], compile_options['mode'], compile_options['sibling']]
+
+def _convert_job(job):
+    """进程池任务: 转换单个文件, 返回 (是否成功, 源文件哈希, 输出文件哈希, 错误信息, 删除的语句)"""
+    input_file, output_file, compile_options, prune = job
+    try:
+        os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+        source_hash, output_hash, removals = convert_to(input_file, output_file, prune)
+        if compile_options:
+            compile_output(output_file, **compile_options)
+        return True, source_hash, output_hash, None, removals
+    except Exception as e:
+        return False, None, None, str(e), []
+
+def _report_removals(code_file, removals, detail=False):
+    """输出优化删除的语句: 摘要, detail 时逐条列出"""
+    if not removals:
+        return
+    print(f"[PRUNE] {code_file}: 删除 {code_optimizer.summarize(removals)}")
+    if detail:
+        for removal in removals:
+            kind = code_optimizer.KIND_NAMES[removal.kind]
+            print(f"    第 {removal.line} 行 {kind} {removal.name}: {removal.reason}")
+
+def convert_file(input_file, output_file=None, compile_options=None, prune=False):
+    """转换单个文件; compile_options 为 compile_output 的参数, 给出时同时生成 .pyc"""
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            code_content = f.read()
-        
-        converter = CodeToPythonConverter()
-        python_content = converter.convert_code_to_python(code_content)
-        
         if output_file is None:
             output_file = input_file.replace('.code', '.py')
         
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(python_content)
+        _, _, removals = convert_to(input_file, output_file, prune)
+        _report_removals(input_file, removals, detail=True)
+        optimize = compile_options['optimize'] if compile_options else 0
+        install_runtime(os.path.dirname(os.path.abspath(output_file)), optimize)
+        if compile_options:
+            compile_output(output_file, **compile_options)
         
         print(f"[SUCCESS] 转换成功: {input_file} -> {output_file}")
         return True
@@ -417,34 +622,321 @@ def convert_file(input_file, output_file=None):
         print(f"[ERROR] 转换失败: {input_file} - {str(e)}")
         return False
 
-def convert_directory(input_dir, output_dir=None):
-    """转换目录中的所有 .code 文件"""
+def load_manifest(output_dir):
+    """读取输出目录中的增量转换清单"""
+    manifest_file = Path(output_dir) / MANIFEST_NAME
+    try:
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('converter_version') == CONVERTER_VERSION:
+            return manifest.get('files', {})
+    except (OSError, ValueError):
+        pass
+    return {}
+
+def save_manifest(output_dir, files):
+    """原子写入增量转换清单"""
+    manifest = {'converter_version': CONVERTER_VERSION, 'files': files}
+    data = json.dumps(manifest, ensure_ascii=False, sort_keys=True, indent=1).encode('utf-8')
+    _atomic_write(Path(output_dir) / MANIFEST_NAME, data)
+
+def _stat_key(path):
+    """用于快速判断文件是否变化的 [大小, 修改时间]"""
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+def _is_up_to_date(entry, code_file, output_file):
+    """判断清单记录是否仍然有效; 仅在 stat 变化时才重新计算哈希"""
+    if not entry or entry.get('converter_version') != CONVERTER_VERSION:
+        return False
+    try:
+        source_stat = _stat_key(code_file)
+        output_stat = _stat_key(output_file)
+    except OSError:
+        return False
+    
+    if source_stat != entry.get('source_stat'):
+        if _hash_file(code_file) != entry.get('source_hash'):
+            return False
+        entry['source_stat'] = source_stat
+    if output_stat != entry.get('output_stat'):
+        if _hash_file(output_file) != entry.get('output_hash'):
+            return False
+        entry['output_stat'] = output_stat
+    return True
+
+def _iter_code_files(input_path, recursive=False, directories=None):
+    """按稳定顺序列出 .code 文件; 递归模式下遍历所有子目录, 给出 directories 字典时记录遍历到的目录的修改时间"""
+    if not recursive:
+        yield from sorted(input_path.glob('*.code'))
+        return
+    for dirpath, dirnames, filenames in os.walk(input_path):
+        if directories is not None:
+            directories[Path(dirpath)] = _dir_mtime(dirpath)
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith('.code'):
+                yield Path(dirpath) / filename
+
+def convert_directory(input_dir, output_dir=None, force=False, recursive=False, jobs=1, compile_options=None,
+                      prune=False):
+    """转换目录中的所有 .code 文件, 跳过清单中记录为未变化的文件
+    
+    recursive 为 True 时遍历子目录并在输出目录中保持相同的目录结构;
+    jobs 大于 1 时在进程池中并行转换, 结果仍按文件顺序输出;
+    给出 compile_options 时同时生成 .pyc, 缺少 .pyc 或编译选项变化的文件不会被跳过;
+    prune 为 True 时删除无效语句, 是否优化同样记录在清单中。
+    """
+    start_time = time.perf_counter()
     input_path = Path(input_dir)
     
     if output_dir is None:
         output_dir = input_dir
     
     output_path = Path(output_dir)
-    output_path.mkdir(exist_ok=True)
+    output_path.mkdir(parents=True, exist_ok=True)
     
-    success_count = 0
-    total_count = 0
+    old_manifest = load_manifest(output_path)
+    manifest = {}
+    pending = []
+    output_dirs = set()
+    skipped_count = 0
+    visited = set()
     
-    for code_file in input_path.glob('*.code'):
-        total_count += 1
-        output_file = output_path / f"{code_file.stem}.py"
+    for code_file in _iter_code_files(input_path, recursive):
+        relative = code_file.relative_to(input_path)
+        key = relative.as_posix()
+        visited.add(key)
+        output_file = output_path / relative.with_suffix('.py')
+        entry = {} if force else dict(old_manifest.get(key) or {})
+        output_dirs.add(output_file.parent)
         
-        if convert_file(str(code_file), str(output_file)):
-            success_count += 1
+        if (_is_up_to_date(entry, code_file, output_file) and entry.get('prune', False) == prune
+                and _pyc_up_to_date(entry, output_file, compile_options)):
+            manifest[key] = entry
+            skipped_count += 1
+        else:
+            pending.append((key, code_file, output_file))
     
-    print(f"\n转换完成: {success_count}/{total_count} 个文件成功转换")
-    return success_count, total_count
+    job_args = [(str(code_file), str(output_file), compile_options, prune) for _, code_file, output_file in pending]
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    if jobs > 1 and len(job_args) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(job_args))) as executor:
+            chunksize = max(1, len(job_args) // (jobs * 4))
+            results = executor.map(_convert_job, job_args, chunksize=chunksize)
+            converted_count, failed_count = _collect_results(pending, results, manifest, compile_options, prune)
+    else:
+        results = map(_convert_job, job_args)
+        converted_count, failed_count = _collect_results(pending, results, manifest, compile_options, prune)
+    
+    # 本次没有遍历到的文件 (不带 -r 运行、另一个输入目录输出到同一目录) 保留原有记录,
+    # 只去掉生成文件已不存在的条目
+    for key, entry in old_manifest.items():
+        if key not in visited and (output_path / Path(key).with_suffix('.py')).exists():
+            manifest[key] = entry
+    
+    if manifest != old_manifest:
+        save_manifest(output_path, manifest)
+    
+    # 每个含生成文件的输出目录都需要运行时模块
+    optimize = compile_options['optimize'] if compile_options else 0
+    for runtime_dir in sorted(output_dirs):
+        if runtime_dir.is_dir():
+            install_runtime(runtime_dir, optimize)
+    
+    total_count = converted_count + skipped_count + failed_count
+    elapsed = time.perf_counter() - start_time
+    print(f"\n转换完成: 转换 {converted_count}, 跳过 {skipped_count}, 失败 {failed_count} "
+          f"(共 {total_count} 个文件, 用时 {elapsed:.3f}s)")
+    return converted_count + skipped_count, total_count
+
+def _collect_results(pending, results, manifest, compile_options=None, prune=False):
+    """按提交顺序汇报转换结果并更新清单, 返回 (成功数, 失败数)"""
+    converted_count = failed_count = 0
+    for (key, code_file, output_file), (ok, source_hash, output_hash, error, removals) in zip(pending, results):
+        if not ok:
+            print(f"[ERROR] 转换失败: {code_file} - {error}")
+            failed_count += 1
+            continue
+        
+        print(f"[SUCCESS] 转换成功: {code_file} -> {output_file}")
+        _report_removals(code_file, removals)
+        converted_count += 1
+        manifest[key] = _manifest_entry(key, code_file, output_file, source_hash, output_hash)
+        if prune:
+            manifest[key]['prune'] = True
+        if compile_options:
+            manifest[key]['pyc'] = _pyc_key(compile_options)
+    return converted_count, failed_count
+
+def _pyc_up_to_date(entry, output_file, compile_options):
+    """未要求编译, 或者 .pyc 存在且按相同选项生成"""
+    if not compile_options:
+        return True
+    cfile = pyc_path(str(output_file), compile_options['optimize'], compile_options['sibling'])
+    return entry.get('pyc') == _pyc_key(compile_options) and os.path.exists(cfile)
+
+def _manifest_entry(key, code_file, output_file, source_hash, output_hash):
+    """一个已转换文件的清单记录"""
+    return {
+        'converter_version': CONVERTER_VERSION,
+        'output': Path(key).with_suffix('.py').as_posix(),
+        'source_hash': source_hash,
+        'source_stat': _stat_key(code_file),
+        'output_hash': output_hash,
+        'output_stat': _stat_key(output_file),
+    }
+
+class _AppRunner:
+    """监视模式下运行生成的程序, 重新转换后先结束旧进程再启动新进程"""
+    def __init__(self, py_file):
+        self.py_file = str(py_file)
+        self.process = None
+    
+    def restart(self):
+        self.stop()
+        print(f"[WATCH] 启动: {self.py_file}")
+        self.process = subprocess.Popen([sys.executable, self.py_file])
+    
+    def stop(self):
+        if self.process is None or self.process.poll() is not None:
+            self.process = None
+            return
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+
+def _watch_targets(input_path, output, recursive):
+    """当前需要监视的 {.code 文件: (清单键, 输出文件)}, 以及扫描过的 {目录: 修改时间}"""
+    if input_path.is_file():
+        output_file = Path(output) if output else input_path.with_suffix('.py')
+        return {input_path: (None, output_file)}, {}
+    output_path = Path(output) if output else input_path
+    targets = {}
+    directories = {input_path: _dir_mtime(input_path)}
+    for code_file in _iter_code_files(input_path, recursive, directories):
+        relative = code_file.relative_to(input_path)
+        targets[code_file] = (relative.as_posix(), output_path / relative.with_suffix('.py'))
+    return targets, directories
+
+def _dir_mtime(directory):
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+def _directories_changed(directories):
+    """目录中有文件或子目录被创建、删除或重命名时其修改时间会变化; 只需 stat 目录, 不必遍历"""
+    return any(_dir_mtime(directory) != mtime for directory, mtime in directories.items())
+
+def watch(input_path, output=None, recursive=False, run=False, interval=0.05, prune=False):
+    """监视模式: 轮询 .code 文件的 stat, 保存后只在当前进程中重新转换变化的文件
+    
+    转换器和解析器在整个会话中保持加载, 单个文件的重新转换不需要启动新进程;
+    run 为 True 时 (仅单个文件) 每次转换成功后重启生成的程序。按 Ctrl+C 退出。
+    """
+    input_path = Path(input_path)
+    if input_path.is_file():
+        if not convert_file(str(input_path), output, prune=prune):
+            print("[WATCH] 首次转换失败, 等待文件修改...")
+        output_path = None
+    else:
+        convert_directory(str(input_path), output, recursive=recursive, prune=prune)
+        output_path = Path(output) if output else input_path
+        run = False
+    
+    targets, directories = _watch_targets(input_path, output, recursive)
+    scanned = time.monotonic()
+    stats = {}
+    for code_file in targets:
+        try:
+            stats[code_file] = _stat_key(code_file)
+        except OSError:
+            pass
+    runner = _AppRunner(targets[input_path][1]) if run else None
+    if runner and targets[input_path][1].exists():
+        runner.restart()
+    print(f"[WATCH] 正在监视 {input_path} (Ctrl+C 退出)")
+    
+    poll_time = 0
+    try:
+        while True:
+            # 文件很多、一次轮询耗时超过间隔的一半时, 按耗时的两倍休眠, 轮询最多占用约三分之一的 CPU
+            time.sleep(max(interval, poll_time * 2))
+            poll_start = time.perf_counter()
+            # 目录模式: 每次轮询只 stat 已知的文件和目录, 目录变化时才重新遍历以发现新文件;
+            # 另外每隔 WATCH_RESCAN_INTERVAL 秒完整遍历一次, 覆盖修改时间精度低的文件系统
+            if output_path is not None and (_directories_changed(directories)
+                                            or time.monotonic() - scanned >= WATCH_RESCAN_INTERVAL):
+                targets, directories = _watch_targets(input_path, output, recursive)
+                scanned = time.monotonic()
+            changed = []
+            for code_file in targets:
+                try:
+                    stat = _stat_key(code_file)
+                except OSError:
+                    continue
+                if stats.get(code_file) != stat:
+                    stats[code_file] = stat
+                    changed.append(code_file)
+            poll_time = time.perf_counter() - poll_start
+            for code_file in changed:
+                _watch_convert(code_file, *targets[code_file], output_path, prune)
+            if changed and runner:
+                runner.restart()
+    except KeyboardInterrupt:
+        print("\n[WATCH] 已停止")
+    finally:
+        if runner:
+            runner.stop()
+    return 0
+
+def _watch_convert(code_file, key, output_file, output_path, prune=False):
+    """监视模式下重新转换一个文件; 目录模式同时更新增量清单"""
+    start_time = time.perf_counter()
+    try:
+        os.makedirs(output_file.parent, exist_ok=True)
+        source_hash, output_hash, removals = convert_to(str(code_file), str(output_file), prune)
+        install_runtime(str(output_file.parent))
+    except Exception as e:
+        print(f"[ERROR] 转换失败: {code_file} - {e}")
+        return False
+    elapsed = (time.perf_counter() - start_time) * 1000
+    print(f"[WATCH] 重新转换: {code_file} -> {output_file} ({elapsed:.1f} ms)")
+    _report_removals(code_file, removals)
+    if output_path is not None:
+        manifest = load_manifest(output_path)
+        manifest[key] = _manifest_entry(key, code_file, output_file, source_hash, output_hash)
+        if prune:
+            manifest[key]['prune'] = True
+        save_manifest(output_path, manifest)
+    return True
 
 def main():
     parser = argparse.ArgumentParser(description='将 .code 文件转换为 .py 文件')
     parser.add_argument('input', help='输入文件或目录')
     parser.add_argument('-o', '--output', help='输出文件或目录')
     parser.add_argument('-r', '--recursive', action='store_true', help='递归处理子目录')
+    parser.add_argument('-f', '--force', action='store_true', help='忽略增量清单, 重新转换所有文件')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='并行转换的进程数 (0 表示 CPU 核数)')
+    parser.add_argument('-c', '--compile', action='store_true', help='同时生成预编译字节码 (.pyc)')
+    parser.add_argument('-O', '--optimize', type=int, choices=[0, 1, 2], default=0,
+                        help='字节码优化级别, 与 python -O/-OO 对应 (默认 0)')
+    parser.add_argument('--pyc-mode', choices=sorted(PYC_MODES), default='timestamp',
+                        help='.pyc 失效检查方式; checked-hash/unchecked-hash 用于可重现构建')
+    parser.add_argument('--pyc-sibling', action='store_true',
+                        help='.pyc 写在 .py 旁边 (可直接 python app.pyc 运行), 而不是 __pycache__')
+    parser.add_argument('--prune', action='store_true',
+                        help='删除从未布局的控件、未被引用的函数和被覆盖的属性设置, 并报告删除的内容')
+    parser.add_argument('--no-cache', action='store_true', help='不使用 (也不写入) 转换结果缓存')
+    parser.add_argument('-w', '--watch', action='store_true', help='监视模式: 文件保存后自动重新转换')
+    parser.add_argument('--run', action='store_true', help='监视单个文件时, 每次转换后重新启动生成的程序')
+    parser.add_argument('--interval', type=float, default=0.05, help='监视模式的轮询间隔 (秒)')
     
     args = parser.parse_args()
     
@@ -454,16 +946,30 @@ def main():
         print(f"错误: 输入路径不存在: {args.input}")
         return 1
     
+    if input_path.is_file() and input_path.suffix != '.code':
+        print(f"错误: 输入文件必须是 .code 文件: {args.input}")
+        return 1
+    
+    if args.no_cache:
+        # 通过环境变量传递, 进程池中的子进程同样生效
+        os.environ[CACHE_DIR_VAR] = ''
+    
+    if args.watch:
+        return watch(input_path, args.output, recursive=args.recursive, run=args.run, interval=args.interval,
+                     prune=args.prune)
+    
+    compile_options = None
+    if args.compile:
+        compile_options = {'optimize': args.optimize, 'mode': args.pyc_mode, 'sibling': args.pyc_sibling}
+    
     if input_path.is_file():
-        if input_path.suffix != '.code':
-            print(f"错误: 输入文件必须是 .code 文件: {args.input}")
-            return 1
-        
-        success = convert_file(str(input_path), args.output)
+        success = convert_file(str(input_path), args.output, compile_options, args.prune)
         return 0 if success else 1
     
     elif input_path.is_dir():
-        success_count, total_count = convert_directory(str(input_path), args.output)
+        success_count, total_count = convert_directory(str(input_path), args.output, force=args.force,
+                                                       recursive=args.recursive, jobs=args.jobs,
+                                                       compile_options=compile_options, prune=args.prune)
         return 0 if success_count == total_count else 1
     
     return 1
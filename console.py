@@ -3,9 +3,19 @@ import os
 import subprocess
 from pathlib import Path
 from interpreter import PythonPPInterpreter
+import code_daemon
 
-def auto_convert_code_file(code_file):
-    """自动转换 .code 文件为 .py 文件"""
+# 转换器脚本与本文件位于同一目录, 不依赖当前工作目录
+CONVERTER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code_to_py.py')
+# 转换子进程的超时 (秒), None 表示不限制; 转换是流式的, 大文件也不会卡住
+CONVERT_TIMEOUT = None
+
+def auto_convert_code_file(code_file, use_subprocess=False):
+    """自动转换 .code 文件为 .py 文件
+    
+    常驻转换服务 (code_daemon.py) 在运行时交给服务转换, 否则在当前进程中转换;
+    use_subprocess 为 True 时不使用服务, 改为启动 code_to_py.py 子进程。
+    """
     try:
         code_path = Path(code_file)
         if not code_path.exists():
@@ -14,10 +24,22 @@ def auto_convert_code_file(code_file):
         # 生成对应的 .py 文件名
         py_file = code_path.with_suffix('.py')
         
+        if not use_subprocess:
+            try:
+                return code_daemon.convert(str(code_path), str(py_file))
+            except code_daemon.DaemonUnavailable:
+                pass
+        
+        if not use_subprocess:
+            import code_to_py
+            code_to_py.convert_to(str(code_path), str(py_file))
+            code_to_py.install_runtime(os.path.dirname(os.path.abspath(py_file)))
+            return str(py_file), None
+        
         # 运行转换器
         result = subprocess.run([
-            sys.executable, "code_to_py.py", str(code_path)
-        ], capture_output=True, text=True, timeout=30)
+            sys.executable, CONVERTER_SCRIPT, str(code_path)
+        ], capture_output=True, text=True, timeout=CONVERT_TIMEOUT)
         
         if result.returncode == 0:
             if py_file.exists():
@@ -32,24 +54,83 @@ def auto_convert_code_file(code_file):
     except Exception as e:
         return None, f"转换异常: {str(e)}"
 
+def run_python_file(py_file):
+    """在当前进程中以 __main__ 身份运行生成的 .py 文件, 返回退出码
+    
+    程序在全新的模块命名空间中执行; sys.argv 和 sys.path 在运行期间指向该程序,
+    结束后恢复, 程序中的 sys.exit() 只结束程序本身。程序导入的模块 (sys.modules)
+    和运行时安装的异常钩子同样在结束后恢复, 下次运行不会沿用上一个程序的模块。
+    """
+    import runpy
+    import threading
+    import code_sourcemap
+    py_file = os.path.abspath(py_file)
+    saved_argv, saved_path = sys.argv, sys.path[:]
+    saved_modules = sys.modules.copy()
+    saved_hooks = sys.excepthook, threading.excepthook
+    sys.argv = [py_file]
+    sys.path.insert(0, os.path.dirname(py_file))
+    try:
+        runpy.run_path(py_file, run_name='__main__')
+        return 0
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except Exception as e:
+        # 与独立运行时相同: 略去 console/runpy 的帧, 回溯按 .code 位置显示
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != py_file:
+            tb = tb.tb_next
+        sys.stderr.write(''.join(code_sourcemap.format_exception(type(e), e, tb or e.__traceback__)))
+        return 1
+    finally:
+        sys.argv, sys.path[:] = saved_argv, saved_path
+        sys.excepthook, threading.excepthook = saved_hooks
+        for name in set(sys.modules) - set(saved_modules):
+            del sys.modules[name]
+        sys.modules.update(saved_modules)
+
+def run_code_file(interpreter, code_file, use_subprocess=False):
+    """自动转换并运行 .code 文件; 转换失败时回退为解释执行"""
+    py_file, error = auto_convert_code_file(code_file, use_subprocess)
+    if error:
+        print(f"[转换错误] {error}")
+        print("尝试直接运行 .code 文件...")
+        interpreter.run_file(code_file)
+        return
+    print(f"[自动转换] {code_file} -> {py_file}")
+    print("运行转换后的 Python 文件...")
+    if not use_subprocess:
+        run_python_file(py_file)
+        return
+    try:
+        subprocess.run([sys.executable, str(py_file)])
+    except Exception as e:
+        print(f"[运行错误] {e}")
+        print("尝试直接运行 .code 文件...")
+        interpreter.run_file(code_file)
+
 def main():
     interpreter = PythonPPInterpreter()
-    if len(sys.argv) == 2 and sys.argv[1].endswith('.code'):
+    args = sys.argv[1:]
+    # --subprocess: 转换和运行都在子进程中进行 (旧行为), 用于需要完全隔离的程序
+    use_subprocess = '--subprocess' in args
+    if use_subprocess:
+        args.remove('--subprocess')
+    if len(args) == 2 and '--watch' in args:
+        # 监视模式: 保存后在当前进程中重新转换, 并重启程序
+        code_file = args[1] if args[0] == '--watch' else args[0]
+        if not code_file.endswith('.code') or not os.path.exists(code_file):
+            print(f"[转换错误] 文件不存在或不是 .code 文件: {code_file}")
+            return
+        import code_to_py
+        code_to_py.watch(code_file, run=True)
+        return
+    if len(args) == 1 and args[0].endswith('.code'):
         # 自动转换并运行
-        py_file, error = auto_convert_code_file(sys.argv[1])
-        if error:
-            print(f"[转换错误] {error}")
-            print("尝试直接运行 .code 文件...")
-            interpreter.run_file(sys.argv[1])
-        else:
-            print(f"[自动转换] {sys.argv[1]} -> {py_file}")
-            print("运行转换后的 Python 文件...")
-            try:
-                subprocess.run([sys.executable, str(py_file)])
-            except Exception as e:
-                print(f"[运行错误] {e}")
-                print("尝试直接运行 .code 文件...")
-                interpreter.run_file(sys.argv[1])
+        run_code_file(interpreter, args[0], use_subprocess)
         return
     print('python++ 控制台 (输入 exit 退出, 支持 run/open 多行块, 直接输入 .code 文件名可执行)')
     buffer = []
@@ -63,20 +144,7 @@ def main():
                     break
                 if line.strip().endswith('.code') and os.path.exists(line.strip()):
                     # 自动转换并运行
-                    py_file, error = auto_convert_code_file(line.strip())
-                    if error:
-                        print(f"[转换错误] {error}")
-                        print("尝试直接运行 .code 文件...")
-                        interpreter.run_file(line.strip())
-                    else:
-                        print(f"[自动转换] {line.strip()} -> {py_file}")
-                        print("运行转换后的 Python 文件...")
-                        try:
-                            subprocess.run([sys.executable, str(py_file)])
-                        except Exception as e:
-                            print(f"[运行错误] {e}")
-                            print("尝试直接运行 .code 文件...")
-                            interpreter.run_file(line.strip())
+                    run_code_file(interpreter, line.strip(), use_subprocess)
                     continue
                 if line.strip().startswith('run') or line.strip().startswith('open '):
                     in_block = True
@@ -336,12 +336,14 @@ class PythonPPInterpreter:
     def run_line(self, line):
         try:
             line = line.rstrip('\n')
+            # 块注释规则与 code_parser.scan_lines 相同: 缩进后以 /* 开头的行开始注释,
+            # 直到包含 */ 的行 (可以是同一行) 为止; 行中其它位置的 /* 不是注释
             if self.in_multiline_comment:
                 if '*/' in line:
                     self.in_multiline_comment = False
                 return
-            if '/*' in line:
-                self.in_multiline_comment = True
+            if line.lstrip(' \t').startswith('/*'):
+                self.in_multiline_comment = '*/' not in line.lstrip(' \t')[2:]
                 return
             if not line.strip() or line.strip().startswith('#'):
                 return
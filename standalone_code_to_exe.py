@@ -7,22 +7,241 @@
 
 import os
 import sys
+import ast
+import glob
+import json
+import time
+import re
+import hashlib
+import threading
+import collections
 import subprocess
 import argparse
 import shutil
+import zipapp
 import tempfile
-import re
+import py_compile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import code_to_py
+
+# 运行时模块 (code_runtime, code_sourcemap) 所在目录, 打包时加入 PyInstaller 的搜索路径
+RUNTIME_DIR = os.path.dirname(os.path.abspath(__file__))
+# 打包结果缓存的容量上限和最长保留时间; 超出时按最近使用时间淘汰
+BUILD_CACHE_MAX_BYTES = 2 * 1024 ** 3
+BUILD_CACHE_MAX_AGE = 30 * 24 * 3600
+# 单个构建的默认超时 (秒)
+BUILD_TIMEOUT = 300
+# PyInstaller 日志中标志各构建阶段开始的行, 如 "INFO: checking Analysis"、"INFO: Building PYZ (ZlibArchive) ..."
+PHASE_RE = re.compile(r'INFO: (?:Building|checking|Running) (Analysis|PYZ|PKG|EXE|COLLECT)\b')
+# 构建失败时错误信息中保留的 PyInstaller 输出行数
+ERROR_TAIL_LINES = 40
+# 打包方式: onefile 为单个可执行文件 (每次启动先解压到临时目录), onedir 为目录 (启动更快, 文件较多);
+# pyz 不使用 PyInstaller, 用 zipapp 打包为需要目标机器上已安装 Python 的 .pyz
+BUILD_MODES = ('onefile', 'onedir', 'pyz')
+# .pyz 的 shebang; Windows 上由 py 启动器解释
+PYZ_INTERPRETER = '/usr/bin/env python3'
+# 与 code_runtime.STARTUP_PROBE_VAR 相同: 设置后程序在首次绘制完成后立即退出, 用于测量启动耗时
+STARTUP_PROBE_VAR = 'PYPP_STARTUP_PROBE'
+# 程序用不到时可以排除的大型标准库包和常见第三方包; PyInstaller 常因条件导入把它们打包进来
+EXCLUDE_CANDIDATES = (
+    'unittest', 'doctest', 'pydoc', 'pdb', 'test', 'idlelib', 'turtledemo', 'tkinter.test', 'lib2to3',
+    'distutils', 'setuptools', 'pkg_resources', 'email', 'http', 'xmlrpc', 'xml', 'urllib', 'ssl',
+    'multiprocessing', 'asyncio', 'concurrent', 'sqlite3', 'ctypes', 'decimal', 'csv', 'json',
+    'lzma', 'bz2', 'numpy', 'pygame',
+)
+# 导入足迹的计算方式版本, 变化时需递增, 使缓存的足迹失效
+FOOTPRINT_VERSION = '3'
+# 测量导入足迹: 以非 __main__ 名称执行生成的程序 (只执行导入和顶层定义, 不进入 main() 和主循环),
+# 再导入程序中 (包括函数体内) 出现的其它模块, 输出此时已加载的全部模块。
+# 测量代码本身不导入任何模块 (只用 sys 和内置函数), 以免混入足迹
+_FOOTPRINT_SNIPPET = '''
+import sys
+sys.path[:0] = sys.argv[2:4]
+with open(sys.argv[1], 'rb') as f:
+    exec(compile(f.read(), sys.argv[1], 'exec'), {'__name__': 'pypp_footprint', '__file__': sys.argv[1]})
+for name in filter(None, sys.argv[4].split(',')):
+    try:
+        __import__(name)
+    except Exception:
+        pass
+print(sorted(sys.modules))
+'''
+
+def _tree_size(path):
+    """文件或目录 (递归) 的总字节数"""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(dirpath, name)) for name in filenames)
+    return total
+
+def _link_or_copy(source, target):
+    """硬链接文件, 跨文件系统等无法链接时复制"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+def _copy_artifact(source, target, link=False):
+    """复制构建产物 (文件或 onedir 目录) 到 target, 覆盖已有的同名产物"""
+    if os.path.isdir(target) and not os.path.islink(target):
+        shutil.rmtree(target)
+    elif os.path.lexists(target):
+        os.remove(target)
+    copy = _link_or_copy if link else shutil.copy2
+    if os.path.isdir(source):
+        shutil.copytree(source, target, copy_function=copy)
+    else:
+        copy(source, target)
+
+def program_imports(py_file, package=''):
+    """生成代码中所有 import 语句 (包括函数体内) 导入的模块名
+    
+    from 包 import 名称 中的名称可能是子模块, 也一并列出; 以字符串字面量调用的
+    __import__('x') 和 importlib.import_module('x') 同样计入。package 为文件所在的包,
+    给出时相对导入 (from . import x) 按它解析为绝对模块名。
+    """
+    with open(py_file, 'rb') as f:
+        tree = ast.parse(f.read(), py_file)
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and (node.level == 0 or package):
+            module = node.module or ''
+            if node.level:
+                base = package.rsplit('.', node.level - 1)[0] if node.level > 1 else package
+                module = f"{base}.{module}" if module else base
+            if not module:
+                continue
+            names.add(module)
+            names.update(f"{module}.{alias.name}" for alias in node.names if alias.name != '*')
+        elif (isinstance(node, ast.Call) and node.args and isinstance(node.args[0], ast.Constant)
+              and isinstance(node.args[0].value, str)):
+            func = node.func
+            func_name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+            if func_name in ('__import__', 'import_module'):
+                names.add(node.args[0].value)
+    return names
+
+def _local_module(name, search_path):
+    """模块 name 在 search_path 中的源文件 (模块.py 或 包/__init__.py), 不是本地模块时返回 None"""
+    parts = name.split('.')
+    for directory in search_path:
+        base = os.path.join(directory, *parts)
+        for candidate in (base + '.py', os.path.join(base, '__init__.py')):
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+def static_imports(py_file):
+    """程序及其 (递归) 导入的本地模块中静态出现的全部导入, 返回 (模块名集合, 本地源文件列表)
+    
+    本地模块指运行时目录和程序所在目录中的 .py (如 cmd.py、code_runtime.py), 它们随程序打包,
+    函数体内延迟导入的模块 (cmd 中的 asyncio、concurrent.futures 等) 同样需要保留。
+    """
+    py_file = os.path.abspath(py_file)
+    search_path = [RUNTIME_DIR, os.path.dirname(py_file)]
+    names = set()
+    files = [py_file]
+    pending = [(py_file, '')]
+    while pending:
+        source, package = pending.pop()
+        for name in program_imports(source, package):
+            names.add(name)
+            local = _local_module(name, search_path)
+            if local is None or local in files:
+                continue
+            files.append(local)
+            is_package = os.path.basename(local) == '__init__.py'
+            pending.append((local, name if is_package else name.rpartition('.')[0]))
+    return names, files
+
+def analyze_imports(py_file):
+    """程序的导入足迹: 在子进程中测量实际加载的全部模块, 再加上静态出现的导入, 返回模块名集合
+    
+    静态导入取自程序及其导入的本地模块 (见 static_imports), 这些模块 (连同其上级包) 即使在测量时
+    未被加载 (在函数体内延迟导入、分析环境缺少依赖、导入时出错) 也计入足迹, 不会被排除。
+    """
+    py_file = os.path.abspath(py_file)
+    static_names, _ = static_imports(py_file)
+    result = subprocess.run(
+        [sys.executable, '-I', '-c', _FOOTPRINT_SNIPPET, py_file, RUNTIME_DIR, os.path.dirname(py_file),
+         ','.join(sorted(static_names))],
+        capture_output=True, text=True, timeout=60)
+    if result.returncode != 0:
+        raise RuntimeError(f"分析导入失败: {result.stderr.strip()}")
+    footprint = set(ast.literal_eval(result.stdout.splitlines()[-1]))
+    for name in static_names:
+        parts = name.split('.')
+        footprint.update('.'.join(parts[:index]) for index in range(1, len(parts) + 1))
+    return footprint
+
+def compute_excludes(footprint):
+    """EXCLUDE_CANDIDATES 中不在导入足迹里的包"""
+    return [name for name in EXCLUDE_CANDIDATES
+            if not any(module == name or module.startswith(name + '.') for module in footprint)]
+
+def measure_artifact(path, runs=3):
+    """产物的大小和启动耗时; 第一次运行为冷启动 (onefile 需先解压), 其余取最快一次为热启动"""
+    executable = path
+    command = [sys.executable, path] if path.endswith('.pyz') else [path]
+    if os.path.isdir(path):
+        name = os.path.basename(path)
+        executable = next(os.path.join(path, entry) for entry in sorted(os.listdir(path))
+                          if os.path.splitext(entry)[0] == name and os.path.isfile(os.path.join(path, entry)))
+        command = [executable]
+    env = dict(os.environ, **{STARTUP_PROBE_VAR: '1'})
+    times = []
+    returncode = None
+    for _ in range(runs):
+        start_time = time.perf_counter()
+        returncode = subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                    timeout=120).returncode
+        times.append(time.perf_counter() - start_time)
+    return {'size': _tree_size(path), 'cold_start': round(times[0], 3),
+            'warm_start': round(min(times[1:] or times), 3), 'returncode': returncode}
+
+def _write_if_changed(path, data):
+    """内容不同时才写入文件, 返回是否写入"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == data:
+                return False
+    except OSError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
 class StandaloneCodeToEXEConverter:
-    def __init__(self):
+    def __init__(self, clean=False, timeout=BUILD_TIMEOUT, verbose=True, mode='onefile', compress=False):
         self.temp_dir = None
+        self.mode = mode
+        # pyz 模式下是否压缩归档 (更小, 启动时多一步解压)
+        self.compress = compress
+        self.pyinstaller_version = None
+        # 为 True 时每次构建都清除 PyInstaller 的缓存并重新分析
+        self.clean = clean
+        self.timeout = timeout
+        # 为 False 时不输出逐步进度和 PyInstaller 的输出
+        self.verbose = verbose
         
+    def log(self, message):
+        """输出进度信息; 批量打包时 (verbose 为 False) 不输出, 由汇总代替"""
+        if self.verbose:
+            print(message)
+    
     def check_pyinstaller(self):
-        """检查 PyInstaller 是否安装"""
+        """检查 PyInstaller 是否安装, 同时记录其版本 (打包缓存的键的一部分)"""
         try:
             result = subprocess.run(['pyinstaller', '--version'], 
                                   capture_output=True, text=True)
+            if result.returncode == 0:
+                self.pyinstaller_version = result.stdout.strip()
             return result.returncode == 0
         except FileNotFoundError:
             return False
@@ -39,395 +258,79 @@ class StandaloneCodeToEXEConverter:
             print(f"PyInstaller 安装失败: {e}")
             return False
     
-    def convert_code_to_python(self, code_file):
-        """将 .code 文件转换为 Python 代码"""
+    def convert_code_to_python(self, code_file, py_file):
+        """用 code_to_py 的转换引擎把 .code 文件转换为 py_file, 返回 (py_file, 错误信息)
+        
+        与 code_to_py、console 共用按内容寻址的转换缓存, 已转换过的源码不会再次转换。
+        """
         try:
-            with open(code_file, 'r', encoding='utf-8') as f:
-                code_content = f.read()
-            
-            # 内置转换逻辑
-            python_content = self._convert_content(code_content)
-            return python_content, None
+            code_to_py.convert_to(code_file, py_file)
+            return py_file, None
         except Exception as e:
             return None, f"代码转换失败: {str(e)}"
     
-    def _convert_content(self, code_content):
-        """转换代码内容"""
-        lines = code_content.split('\n')
-        python_lines = []
-        
-        # 添加必要的导入
-        python_lines.extend([
-            "#!/usr/bin/env python3",
-            "# -*- coding: utf-8 -*-",
-            "",
-            "import tkinter as tk",
-            "from tkinter import ttk, messagebox, filedialog, simpledialog",
-            "import threading",
-            "import time",
-            "",
-            "# GUI 控制管理器",
-            "class GUIControlManager:",
-            "    def __init__(self):",
-            "        self.controls = {}",
-            "        self.windows = {}",
-            "        self.root = None",
-            "",
-            "    def create_window(self, name, title, width=800, height=600):",
-            "        if name not in self.windows:",
-            "            window = tk.Tk() if self.root is None else tk.Toplevel(self.root)",
-            "            if self.root is None:",
-            "                self.root = window",
-            "            window.title(title)",
-            "            window.geometry(f'{width}x{height}')",
-            "            self.windows[name] = window",
-            "        return self.windows[name]",
-            "",
-            "    def create_control(self, control_type, name, parent='main', **kwargs):",
-            "        if parent not in self.windows:",
-            "            parent = 'main'",
-            "        parent_window = self.windows[parent]",
-            "        ",
-            "        if control_type == 'button':",
-            "            control = tk.Button(parent_window, **kwargs)",
-            "        elif control_type == 'label':",
-            "            control = tk.Label(parent_window, **kwargs)",
-            "        elif control_type == 'entry':",
-            "            control = tk.Entry(parent_window, **kwargs)",
-            "        elif control_type == 'text':",
-            "            control = tk.Text(parent_window, **kwargs)",
-            "        elif control_type == 'listbox':",
-            "            control = tk.Listbox(parent_window, **kwargs)",
-            "        elif control_type == 'combobox':",
-            "            control = ttk.Combobox(parent_window, **kwargs)",
-            "        elif control_type == 'checkbox':",
-            "            control = tk.Checkbutton(parent_window, **kwargs)",
-            "        elif control_type == 'radiobutton':",
-            "            control = tk.Radiobutton(parent_window, **kwargs)",
-            "        elif control_type == 'image':",
-            "            control = tk.Label(parent_window, **kwargs)",
-            "        else:",
-            "            control = tk.Label(parent_window, text=f'Unknown control: {control_type}')",
-            "        ",
-            "        self.controls[name] = control",
-            "        return control",
-            "",
-            "    def set_property(self, control_name, property_name, value):",
-            "        if control_name in self.controls:",
-            "            control = self.controls[control_name]",
-            "            if hasattr(control, property_name):",
-            "                setattr(control, property_name, value)",
-            "",
-            "    def get_property(self, control_name, property_name):",
-            "        if control_name in self.controls:",
-            "            control = self.controls[control_name]",
-            "            if hasattr(control, property_name):",
-            "                return getattr(control, property_name)",
-            "        return None",
-            "",
-            "    def bind_event(self, control_name, event, handler):",
-            "        if control_name in self.controls:",
-            "            control = self.controls[control_name]",
-            "            control.bind(event, handler)",
-            "",
-            "    def layout(self, control_name, method='pack', **kwargs):",
-            "        if control_name in self.controls:",
-            "            control = self.controls[control_name]",
-            "            if method == 'pack':",
-            "                control.pack(**kwargs)",
-            "            elif method == 'grid':",
-            "                control.grid(**kwargs)",
-            "            elif method == 'place':",
-            "                control.place(**kwargs)",
-            "",
-            "    def remove_control(self, control_name):",
-            "        if control_name in self.controls:",
-            "            control = self.controls[control_name]",
-            "            control.destroy()",
-            "            del self.controls[control_name]",
-            "",
-            "    def show_message(self, title, message, message_type='info'):",
-            "        if message_type == 'info':",
-            "            messagebox.showinfo(title, message)",
-            "        elif message_type == 'warning':",
-            "            messagebox.showwarning(title, message)",
-            "        elif message_type == 'error':",
-            "            messagebox.showerror(title, message)",
-            "        elif message_type == 'question':",
-            "            return messagebox.askyesno(title, message)",
-            "",
-            "    def show_input_dialog(self, title, prompt):",
-            "        return simpledialog.askstring(title, prompt)",
-            "",
-            "    def show_file_dialog(self, title, file_types):",
-            "        return filedialog.askopenfilename(title=title, filetypes=file_types)",
-            "",
-            "    def run(self):",
-            "        if self.root:",
-            "            self.root.mainloop()",
-            "",
-            "# 全局 GUI 管理器",
-            "gui = GUIControlManager()",
-            "",
-            "# 主程序开始",
-            "def main():",
-        ])
-        
-        indent_level = 1
-        in_function = False
-        function_name = ""
-        function_body = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            # 处理函数定义
-            if line.startswith('function '):
-                if in_function:
-                    # 结束前一个函数
-                    python_lines.append('    ' * indent_level + f"def {function_name}():")
-                    for body_line in function_body:
-                        python_lines.append('    ' * (indent_level + 1) + body_line)
-                    python_lines.append('')
-                
-                # 开始新函数
-                parts = line.split()
-                function_name = parts[1]
-                in_function = True
-                function_body = []
-                continue
-            
-            # 如果在函数内部
-            if in_function:
-                # 检查是否是函数结束（空行或新的函数定义）
-                if not line or line.startswith('function '):
-                    # 结束当前函数
-                    python_lines.append('    ' * indent_level + f"def {function_name}():")
-                    for body_line in function_body:
-                        python_lines.append('    ' * (indent_level + 1) + body_line)
-                    python_lines.append('')
-                    
-                    if line.startswith('function '):
-                        # 开始新函数
-                        parts = line.split()
-                        function_name = parts[1]
-                        function_body = []
-                    else:
-                        in_function = False
-                        function_name = ""
-                        function_body = []
-                else:
-                    python_line = self._convert_line(line)
-                    if python_line:
-                        function_body.append(python_line)
-                continue
-            
-            # 普通代码行
-            python_line = self._convert_line(line)
-            if python_line:
-                python_lines.append('    ' * indent_level + python_line)
-        
-        # 处理最后一个函数
-        if in_function and function_body:
-            python_lines.append('    ' * indent_level + f"def {function_name}():")
-            for body_line in function_body:
-                python_lines.append('    ' * (indent_level + 1) + body_line)
-            python_lines.append('')
-        
-        # 添加主程序调用
-        python_lines.extend([
-            "",
-            "if __name__ == '__main__':",
-            "    main()",
-            "    gui.run()",
-        ])
-        
-        return '\n'.join(python_lines)
-    
-    def _convert_line(self, line):
-        """转换单行代码"""
-        # 窗口创建
-        if line.startswith('window '):
-            return self._convert_window_creation(line)
-        
-        # 控件创建
-        elif line.startswith(('button ', 'label ', 'entry ', 'text ', 'listbox ', 
-                             'combobox ', 'checkbox ', 'radiobutton ', 'image ')):
-            return self._convert_control_creation(line)
-        
-        # 属性设置
-        elif '=' in line and '.' in line:
-            return self._convert_property_setting(line)
-        
-        # 事件绑定
-        elif line.startswith('bind '):
-            return self._convert_event_binding(line)
-        
-        # 布局
-        elif line.startswith(('pack ', 'grid ', 'place ')):
-            return self._convert_layout(line)
-        
-        # 函数调用
-        elif '(' in line and line.endswith(')'):
-            return self._convert_function_call(line)
-        
-        # 变量赋值
-        elif '=' in line and not line.startswith(('if ', 'for ', 'while ')):
-            return self._convert_assignment(line)
-        
-        # 条件语句
-        elif line.startswith('if '):
-            return self._convert_if_statement(line)
-        
-        # 循环语句
-        elif line.startswith(('for ', 'while ')):
-            return self._convert_loop_statement(line)
-        
-        # 其他语句
-        else:
-            return line
-    
-    def _convert_window_creation(self, line):
-        """转换窗口创建"""
-        parts = line.split()
-        if len(parts) >= 3:
-            name = parts[1]
-            title = parts[2].strip('"')
-            width = parts[3] if len(parts) > 3 else '800'
-            height = parts[4] if len(parts) > 4 else '600'
-            return f"gui.create_window('{name}', '{title}', {width}, {height})"
-        return None
-    
-    def _convert_control_creation(self, line):
-        """转换控件创建"""
-        parts = line.split()
-        control_type = parts[0]
-        name = parts[1]
-        
-        # 提取参数
-        params = {}
-        text_param = None
-        
-        for part in parts[2:]:
-            if '=' in part:
-                key, value = part.split('=', 1)
-                if value.startswith('"') and value.endswith('"'):
-                    value = value[1:-1]
-                params[key] = value
-            else:
-                # 第一个非名称参数通常是文本
-                if text_param is None:
-                    text_param = part.strip('"')
-        
-        # 设置文本参数
-        if text_param:
-            params['text'] = text_param
-        
-        # 构建参数字符串
-        if params:
-            param_str = ", ".join([f"{k}='{v}'" for k, v in params.items()])
-            return f"gui.create_control('{control_type}', '{name}', {param_str})"
-        else:
-            return f"gui.create_control('{control_type}', '{name}')"
-    
-    def _convert_property_setting(self, line):
-        """转换属性设置"""
-        parts = line.split('=')
-        if len(parts) == 2:
-            control_prop = parts[0].strip()
-            value = parts[1].strip()
-            
-            if '.' in control_prop:
-                control_name, prop_name = control_prop.split('.', 1)
-                if value.startswith('"') and value.endswith('"'):
-                    value = f"'{value[1:-1]}'"
-                return f"gui.set_property('{control_name}', '{prop_name}', {value})"
-        return None
-    
-    def _convert_event_binding(self, line):
-        """转换事件绑定"""
-        parts = line.split()
-        if len(parts) >= 4:
-            control_name = parts[1]
-            event = parts[2]
-            handler = parts[3]
-            
-            # 事件名称映射
-            event_map = {
-                'click': 'Button-1',
-                'double': 'Double-Button-1',
-                'right': 'Button-3',
-                'key': 'Key',
-                'enter': 'Return',
-                'focus': 'FocusIn',
-                'blur': 'FocusOut'
-            }
-            
-            tk_event = event_map.get(event, f'<{event}>')
-            return f"gui.bind_event('{control_name}', '{tk_event}', {handler})"
-        return None
+    def import_footprint(self, py_file):
+        """程序的导入足迹 (见 analyze_imports); 结果按生成代码、运行时模块和 Python 版本缓存"""
+        root = code_to_py.cache_dir()
+        if root is None:
+            return analyze_imports(py_file)
+        digest = hashlib.sha256(f"{sys.version}:{FOOTPRINT_VERSION}".encode('utf-8'))
+        # 程序导入的本地模块 (随程序打包) 变化时结果也可能变化
+        _, local_files = static_imports(py_file)
+        for name in local_files + [os.path.join(RUNTIME_DIR, module) for module in code_to_py.RUNTIME_MODULES]:
+            digest.update(code_to_py._hash_file(name).encode('ascii'))
+        cache_file = os.path.join(root, 'footprint', digest.hexdigest() + '.json')
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                return set(json.load(f))
+        except (OSError, ValueError):
+            pass
+        footprint = analyze_imports(py_file)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        code_to_py._atomic_write(cache_file, json.dumps(sorted(footprint)).encode('utf-8'))
+        return footprint
     
-    def _convert_layout(self, line):
-        """转换布局"""
-        parts = line.split()
-        method = parts[0]
-        control_name = parts[1]
-        
-        params = {}
-        for part in parts[2:]:
-            if '=' in part:
-                key, value = part.split('=', 1)
-                params[key] = value
+    def create_spec_file(self, py_file, exe_name, excludes=(), mode='onefile'):
+        """创建 PyInstaller spec 文件
         
-        param_str = ", ".join([f"{k}='{v}'" for k, v in params.items()])
-        return f"gui.layout('{control_name}', '{method}', {param_str})"
-    
-    def _convert_function_call(self, line):
-        """转换函数调用"""
-        if line.endswith('()'):
-            func_name = line[:-2]
-            return f"{func_name}()"
-        return line
-    
-    def _convert_assignment(self, line):
-        """转换变量赋值"""
-        return line
-    
-    def _convert_if_statement(self, line):
-        """转换条件语句"""
-        return line + ':'
-    
-    def _convert_loop_statement(self, line):
-        """转换循环语句"""
-        return line + ':'
-    
-    def create_spec_file(self, py_file, exe_name):
-        """创建 PyInstaller spec 文件"""
-        spec_content = f'''# -*- mode: python ; coding: utf-8 -*-
-
-block_cipher = None
-
-a = Analysis(
-    ['{py_file}'],
-    pathex=[],
-    binaries=[],
-    datas=[],
-    hiddenimports=['tkinter', 'tkinter.ttk', 'tkinter.messagebox', 'tkinter.filedialog', 'tkinter.simpledialog'],
-    hookspath=[],
-    hooksconfig={{}},
-    runtime_hooks=[],
-    excludes=[],
-    win_no_prefer_redirects=False,
-    win_private_assemblies=False,
-    cipher=block_cipher,
-    noarchive=False,
+        hiddenimports 只列出项目自己的运行时模块, tkinter 等由 PyInstaller 从 import 语句中找到;
+        excludes 为导入足迹之外可以排除的包 (见 compute_excludes)。
+        """
+        hiddenimports = [os.path.splitext(module)[0] for module in code_to_py.RUNTIME_MODULES]
+        if mode == 'onedir':
+            # 可执行文件只含脚本, 依赖库和数据放在同一目录中, 启动时不必解压
+            exe_and_collect = f'''exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='{exe_name}',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=None,
 )
 
-pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
-
-exe = EXE(
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    name='{exe_name}',
+)
+'''
+        else:
+            exe_and_collect = f'''exe = EXE(
     pyz,
     a.scripts,
     a.binaries,
@@ -450,56 +353,190 @@ exe = EXE(
     icon=None,
 )
 '''
+        spec_content = f'''# -*- mode: python ; coding: utf-8 -*-
+
+block_cipher = None
+
+a = Analysis(
+    ['{py_file}'],
+    pathex=[{RUNTIME_DIR!r}],
+    binaries=[],
+    datas=[],
+    hiddenimports={hiddenimports!r},
+    hookspath=[],
+    hooksconfig={{}},
+    runtime_hooks=[],
+    excludes={list(excludes)!r},
+    win_no_prefer_redirects=False,
+    win_private_assemblies=False,
+    cipher=block_cipher,
+    noarchive=False,
+)
+
+pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
+
+{exe_and_collect}'''
         return spec_content
     
-    def build_exe(self, py_file, exe_name, output_dir):
-        """构建 exe 文件"""
+    def build_cache_entry(self, py_file, spec_content):
+        """打包缓存条目目录; 键为生成代码、spec、运行时模块、PyInstaller 和 Python 版本的哈希, 缓存禁用时返回 None"""
+        root = code_to_py.cache_dir()
+        if root is None:
+            return None
+        if self.pyinstaller_version is None and not self.check_pyinstaller():
+            return None
+        digest = hashlib.sha256()
+        # 程序导入的本地模块 (随程序打包) 变化时结果也可能变化
+        _, local_files = static_imports(py_file)
+        for name in local_files + [os.path.join(RUNTIME_DIR, module) for module in code_to_py.RUNTIME_MODULES]:
+            digest.update(code_to_py._hash_file(name).encode('ascii'))
+        for part in (spec_content, self.pyinstaller_version, sys.version, sys.platform):
+            digest.update(b'\0' + part.encode('utf-8'))
+        return os.path.join(root, 'exe', digest.hexdigest())
+    
+    def restore_from_cache(self, entry, output_dir):
+        """命中时把缓存的产物硬链接 (跨文件系统时复制) 到输出目录, 返回最后一个产物路径; 未命中返回 None"""
         try:
-            # 创建临时目录
-            temp_dir = tempfile.mkdtemp(prefix="code_to_exe_")
-            
-            # 复制 Python 文件到临时目录
-            temp_py = os.path.join(temp_dir, os.path.basename(py_file))
-            shutil.copy2(py_file, temp_py)
-            
-            # 创建 spec 文件
-            spec_content = self.create_spec_file(os.path.basename(py_file), exe_name)
-            spec_file = os.path.join(temp_dir, f"{exe_name}.spec")
-            
-            with open(spec_file, 'w', encoding='utf-8') as f:
-                f.write(spec_content)
-            
-            # 切换到临时目录
-            original_dir = os.getcwd()
-            os.chdir(temp_dir)
+            names = sorted(os.listdir(entry))
+        except OSError:
+            return None
+        if not names:
+            return None
+        os.makedirs(output_dir, exist_ok=True)
+        target_file = None
+        for name in names:
+            target_file = os.path.join(output_dir, name)
+            _copy_artifact(os.path.join(entry, name), target_file, link=True)
+        # 目录的修改时间记录最近使用时间, 淘汰时使用
+        os.utime(entry)
+        return target_file
+    
+    def store_in_cache(self, entry, files):
+        """把构建产物 (文件或 onedir 目录) 放入缓存并按容量和时间淘汰旧条目"""
+        cache_root = os.path.dirname(entry)
+        os.makedirs(cache_root, exist_ok=True)
+        temp_entry = tempfile.mkdtemp(prefix='.building_', dir=cache_root)
+        try:
+            for source_file in files:
+                _copy_artifact(source_file, os.path.join(temp_entry, os.path.basename(source_file)))
+            os.rename(temp_entry, entry)
+        except OSError:
+            # 其它进程已写入同一条目
+            shutil.rmtree(temp_entry, ignore_errors=True)
+        evict_build_cache(cache_root)
+    
+    def project_dir(self, py_file, exe_name):
+        """项目的持久构建目录, 保存 PyInstaller 的 workpath 和 distpath; 缓存禁用时返回 None"""
+        root = code_to_py.cache_dir()
+        if root is None:
+            return None
+        key = hashlib.sha256(os.path.abspath(py_file).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(root, 'build', f"{exe_name}-{key}")
+    
+    def run_pyinstaller(self, command, cwd, timings):
+        """运行 PyInstaller 并逐行输出其日志, 按日志识别构建阶段并把各阶段耗时记入 timings['phases']
+        
+        返回 (返回码, 最后若干行输出); 超过 self.timeout 时终止进程并抛出 subprocess.TimeoutExpired。
+        """
+        phases = timings.setdefault('phases', {})
+        tail = collections.deque(maxlen=ERROR_TAIL_LINES)
+        process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, errors='replace', bufsize=1)
+        timed_out = threading.Event()
+        
+        def kill():
+            timed_out.set()
+            process.kill()
+        
+        timer = threading.Timer(self.timeout, kill) if self.timeout else None
+        if timer is not None:
+            timer.daemon = True
+            timer.start()
+        phase = 'startup'
+        phase_start = start_time = time.perf_counter()
+        try:
+            with process.stdout:
+                for line in process.stdout:
+                    line = line.rstrip('\n')
+                    tail.append(line)
+                    self.log(f"  {line}")
+                    match = PHASE_RE.search(line)
+                    if match and match.group(1).lower() != phase:
+                        now = time.perf_counter()
+                        phases[phase] = phases.get(phase, 0) + now - phase_start
+                        phase, phase_start = match.group(1).lower(), now
+            returncode = process.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        now = time.perf_counter()
+        phases[phase] = phases.get(phase, 0) + now - phase_start
+        timings['pyinstaller'] = now - start_time
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(command, self.timeout)
+        return returncode, '\n'.join(tail)
+    
+    def build_exe(self, py_file, exe_name, output_dir, timings=None):
+        """构建 exe 文件; 生成代码和 spec 与以前某次构建完全相同时直接使用缓存的结果
+        
+        每个项目使用持久的构建目录, PyInstaller 的分析结果在下次构建时复用;
+        只有 self.clean 为 True 时才传入 --clean 做完全重新分析。
+        给出 timings 字典时记录是否命中缓存和 PyInstaller 各阶段的耗时。
+        """
+        timings = {} if timings is None else timings
+        excludes = compute_excludes(self.import_footprint(py_file))
+        spec_content = self.create_spec_file(os.path.basename(py_file), exe_name, excludes, self.mode)
+        cache_entry = self.build_cache_entry(py_file, spec_content)
+        timings['cache_hit'] = False
+        if cache_entry is not None:
+            target_file = self.restore_from_cache(cache_entry, output_dir)
+            if target_file is not None:
+                timings['cache_hit'] = True
+                self.log(f"[CACHE] 命中打包缓存: {cache_entry}")
+                return True, target_file
+        
+        build_dir = self.project_dir(py_file, exe_name)
+        persistent = build_dir is not None
+        try:
+            if persistent:
+                os.makedirs(build_dir, exist_ok=True)
+            else:
+                build_dir = tempfile.mkdtemp(prefix="code_to_exe_")
             
-            # 运行 PyInstaller
-            print(f"运行 PyInstaller: pyinstaller --clean {spec_file}")
-            result = subprocess.run([
-                'pyinstaller', '--clean', spec_file
-            ], capture_output=True, text=True, timeout=300)
+            # 复制 Python 文件和 spec 到构建目录; 内容未变时保留原文件 (及修改时间), PyInstaller 不会重新分析
+            build_py = os.path.join(build_dir, os.path.basename(py_file))
+            with open(py_file, 'rb') as f:
+                _write_if_changed(build_py, f.read())
+            spec_file = os.path.join(build_dir, f"{exe_name}.spec")
+            _write_if_changed(spec_file, spec_content.encode('utf-8'))
             
-            # 切换回原目录
-            os.chdir(original_dir)
+            # 运行 PyInstaller; 用 cwd 指定工作目录而不是 os.chdir, 多个构建可以同时进行
+            # distpath 每次清空 (切换 onefile/onedir 时不留旧产物), 分析缓存在 workpath 中
+            dist_dir = os.path.join(build_dir, "dist")
+            shutil.rmtree(dist_dir, ignore_errors=True)
+            command = ['pyinstaller', '--noconfirm', '--workpath', os.path.join(build_dir, "build"),
+                       '--distpath', dist_dir]
+            if self.clean:
+                command.append('--clean')
+            command.append(spec_file)
+            self.log(f"运行 PyInstaller: {' '.join(command)}")
+            returncode, output_tail = self.run_pyinstaller(command, build_dir, timings)
             
-            print(f"PyInstaller 返回码: {result.returncode}")
-            print(f"PyInstaller 输出: {result.stdout}")
-            print(f"PyInstaller 错误: {result.stderr}")
+            self.log(f"PyInstaller 返回码: {returncode}")
             
-            if result.returncode != 0:
-                shutil.rmtree(temp_dir)
-                return False, f"PyInstaller 构建失败: {result.stderr}"
+            if returncode != 0:
+                return False, f"PyInstaller 构建失败:\n{output_tail}"
             
-            # 查找生成的 exe 文件
-            dist_dir = os.path.join(temp_dir, "dist")
+            # 查找生成的可执行文件 (Windows 上为 名称.exe) 或 onedir 目录
             if not os.path.exists(dist_dir):
-                shutil.rmtree(temp_dir)
                 return False, "PyInstaller 未生成 dist 目录"
             
-            exe_files = [f for f in os.listdir(dist_dir) if f.endswith('.exe')]
+            exe_files = [f for f in os.listdir(dist_dir) if os.path.splitext(f)[0] == exe_name]
             
             if not exe_files:
-                shutil.rmtree(temp_dir)
                 return False, "未找到生成的 exe 文件"
             
             # 复制到输出目录
@@ -508,24 +545,53 @@ exe = EXE(
             for exe_file in exe_files:
                 source_file = os.path.join(dist_dir, exe_file)
                 target_file = os.path.join(output_dir, exe_file)
-                shutil.copy2(source_file, target_file)
+                _copy_artifact(source_file, target_file)
             
-            # 清理临时目录
-            shutil.rmtree(temp_dir)
+            if cache_entry is not None:
+                self.store_in_cache(cache_entry, [os.path.join(dist_dir, f) for f in exe_files])
             
             return True, target_file
             
         except subprocess.TimeoutExpired:
-            if 'temp_dir' in locals():
-                shutil.rmtree(temp_dir)
-            return False, "构建超时"
+            return False, f"构建超时 ({self.timeout}s)"
         except Exception as e:
-            if 'temp_dir' in locals():
-                shutil.rmtree(temp_dir)
             return False, f"构建异常: {str(e)}"
+        finally:
+            # 清理临时构建目录; 持久构建目录保留给下次构建
+            if not persistent and build_dir is not None:
+                shutil.rmtree(build_dir, ignore_errors=True)
     
-    def convert_file(self, input_file, output_dir=None, exe_name=None):
-        """转换单个文件"""
+    def build_pyz(self, py_file, exe_name, output_dir, timings=None):
+        """用 zipapp 把生成的程序和运行时模块打包为 output_dir/<exe_name>.pyz, 返回 (成功, 文件或错误信息)
+        
+        程序作为 __main__ 放入归档, 每个模块旁附带 unchecked-hash 的 .pyc: zipimport 直接加载字节码,
+        不检查源码; 字节码与运行它的 Python 版本不符时回退到同名 .py。
+        """
+        timings = {} if timings is None else timings
+        start_time = time.perf_counter()
+        try:
+            with tempfile.TemporaryDirectory(prefix='code_to_pyz_') as staging:
+                modules = [(py_file, '__main__.py')]
+                modules += [(os.path.join(RUNTIME_DIR, module), module) for module in code_to_py.RUNTIME_MODULES]
+                for source, name in modules:
+                    target = os.path.join(staging, name)
+                    shutil.copyfile(source, target)
+                    # 归档中的字节码不经过 _fix_co_filename, 文件名用归档内的相对路径 (code_sourcemap 据此映射)
+                    py_compile.compile(target, cfile=os.path.splitext(target)[0] + '.pyc', dfile=name, doraise=True,
+                                       invalidation_mode=code_to_py.PYC_MODES['unchecked-hash'])
+                os.makedirs(output_dir, exist_ok=True)
+                target_file = os.path.join(output_dir, f"{exe_name}.pyz")
+                zipapp.create_archive(staging, target_file, interpreter=PYZ_INTERPRETER, compressed=self.compress)
+            return True, target_file
+        except Exception as e:
+            return False, f"打包 pyz 失败: {str(e)}"
+        finally:
+            timings['zipapp'] = time.perf_counter() - start_time
+    
+    def convert_file(self, input_file, output_dir=None, exe_name=None, timings=None):
+        """转换单个文件; 给出 timings 字典时记录转换、构建各阶段和总耗时 (秒)"""
+        timings = {} if timings is None else timings
+        start_time = time.perf_counter()
         try:
             if not os.path.exists(input_file):
                 return False, f"输入文件不存在: {input_file}"
@@ -535,33 +601,33 @@ exe = EXE(
             
             # 设置输出目录
             if output_dir is None:
-                output_dir = os.path.dirname(input_file)
+                output_dir = os.path.dirname(input_file) or '.'
             
             # 设置 exe 文件名
             if exe_name is None:
                 exe_name = os.path.splitext(os.path.basename(input_file))[0]
             
-            print(f"开始转换: {input_file}")
+            self.log(f"开始转换: {input_file}")
             
-            # 1. 转换代码
-            print("1. 转换 .code 到 Python...")
-            python_content, error = self.convert_code_to_python(input_file)
+            # 1. 转换代码到临时 Python 文件
+            self.log("1. 转换 .code 到 Python...")
+            temp_py = input_file.replace('.code', '_temp.py')
+            _, error = self.convert_code_to_python(input_file, temp_py)
+            timings['convert'] = time.perf_counter() - start_time
             if error:
                 return False, error
             
-            # 2. 创建临时 Python 文件
-            print("2. 创建临时 Python 文件...")
-            temp_py = input_file.replace('.code', '_temp.py')
-            with open(temp_py, 'w', encoding='utf-8') as f:
-                f.write(str(python_content))
-            
             try:
-                # 3. 构建 exe 文件
-                print("3. 构建 exe 文件...")
-                success, result = self.build_exe(temp_py, exe_name, output_dir)
+                # 2. 构建 exe 文件 (pyz 模式下打包 .pyz)
+                if self.mode == 'pyz':
+                    self.log("2. 打包 pyz 文件...")
+                    success, result = self.build_pyz(temp_py, exe_name, output_dir, timings)
+                else:
+                    self.log("2. 构建 exe 文件...")
+                    success, result = self.build_exe(temp_py, exe_name, output_dir, timings)
                 
                 if success:
-                    print(f"[SUCCESS] 转换成功: {input_file} -> {result}")
+                    self.log(f"[SUCCESS] 转换成功: {input_file} -> {result}")
                     return True, result
                 else:
                     return False, result
@@ -572,21 +638,195 @@ exe = EXE(
                     
         except Exception as e:
             return False, f"转换异常: {str(e)}"
+        finally:
+            timings['total'] = time.perf_counter() - start_time
+
+def evict_build_cache(cache_root, max_bytes=BUILD_CACHE_MAX_BYTES, max_age=BUILD_CACHE_MAX_AGE):
+    """删除超过 max_age 秒未使用的条目, 总大小仍超过 max_bytes 时从最久未使用的开始删除"""
+    now = time.time()
+    entries = []
+    with os.scandir(cache_root) as it:
+        for entry in it:
+            if not entry.is_dir(follow_symlinks=False) or entry.name.startswith('.'):
+                continue
+            size = _tree_size(entry.path)
+            entries.append((entry.stat().st_mtime, size, entry.path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in entries:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+def collect_inputs(pattern, recursive=False):
+    """把输入 (文件、目录或通配符) 展开为 [(.code 文件, 相对于输入根目录的子目录)]
+    
+    通配符的根目录为所有匹配文件的公共上级目录, 不同目录中的同名文件 (a/main.code、b/main.code)
+    在输出目录中也分别位于 a/ 和 b/ 下, 不会互相覆盖。
+    """
+    if os.path.isfile(pattern):
+        return [(pattern, '')]
+    if os.path.isdir(pattern):
+        search = os.path.join(pattern, '**', '*.code') if recursive else os.path.join(pattern, '*.code')
+        return [(path, os.path.relpath(os.path.dirname(path), pattern))
+                for path in sorted(glob.glob(search, recursive=recursive))]
+    paths = [path for path in sorted(glob.glob(pattern, recursive=True)) if path.endswith('.code')]
+    if not paths:
+        return []
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in paths])
+    return [(path, os.path.relpath(os.path.dirname(os.path.abspath(path)), root)) for path in paths]
+
+def format_timings(timings):
+    """耗时的一行摘要, 如: 转换 0.02s, analysis 41.3s, pyz 2.1s, pkg 8.0s, exe 1.2s, 合计 53.0s"""
+    parts = [f"转换 {timings.get('convert', 0):.2f}s"]
+    if timings.get('cache_hit'):
+        parts.append("命中打包缓存")
+    parts.extend(f"{phase} {seconds:.1f}s" for phase, seconds in timings.get('phases', {}).items())
+    if 'zipapp' in timings:
+        parts.append(f"zipapp {timings['zipapp']:.2f}s")
+    parts.append(f"合计 {timings.get('total', 0):.1f}s")
+    return ', '.join(parts)
+
+def _round_timings(timings):
+    """写入报告的耗时 (毫秒精度)"""
+    rounded = {}
+    for key, value in timings.items():
+        if isinstance(value, dict):
+            rounded[key] = {name: round(seconds, 3) for name, seconds in value.items()}
+        elif isinstance(value, float):
+            rounded[key] = round(value, 3)
+        else:
+            rounded[key] = value
+    return rounded
+
+def write_report(report_file, converter, results, elapsed, jobs=1, extra=None):
+    """写出 JSON 报告: 每个文件的结果和各阶段耗时, 以及所有构建中各阶段的耗时合计"""
+    phase_totals = {}
+    for entry in results:
+        for phase, seconds in entry.get('timings', {}).get('phases', {}).items():
+            phase_totals[phase] = round(phase_totals.get(phase, 0) + seconds, 3)
+    failed = sum(1 for entry in results if not entry['success'])
+    report = {
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seconds': round(elapsed, 3),
+        'jobs': jobs,
+        'pyinstaller': converter.pyinstaller_version,
+        'python': sys.version.split()[0],
+        'succeeded': len(results) - failed,
+        'failed': failed,
+        'phase_totals': phase_totals,
+        'results': results,
+    }
+    report.update(extra or {})
+    code_to_py._atomic_write(report_file, json.dumps(report, ensure_ascii=False, indent=1).encode('utf-8'))
+    print(f"报告已写入: {report_file}")
+
+def _result_entry(input_file, success, result, timings):
+    entry = {'input': input_file, 'success': success, 'seconds': round(timings.get('total', 0), 3),
+             'timings': _round_timings(timings)}
+    entry['output' if success else 'error'] = result
+    return entry
+
+def convert_batch(converter, inputs, output_dir=None, jobs=1, report_file=None):
+    """用线程池并行打包多个文件 (每个构建是独立的 PyInstaller 进程), 返回结果列表并写出汇总报告"""
+    jobs = jobs or os.cpu_count() or 1
+    print_lock = threading.Lock()
+    start_time = time.perf_counter()
+    
+    def job(item):
+        input_file, subdir = item
+        target_dir = os.path.normpath(os.path.join(output_dir, subdir)) if output_dir else None
+        timings = {}
+        success, result = converter.convert_file(input_file, target_dir, timings=timings)
+        return _result_entry(input_file, success, result, timings)
+    
+    results = []
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(job, item) for item in inputs]
+        for future in as_completed(futures):
+            entry = future.result()
+            results.append(entry)
+            with print_lock:
+                if entry['success']:
+                    print(f"[SUCCESS] {entry['input']} -> {entry['output']} ({format_timings(entry['timings'])})")
+                else:
+                    print(f"[ERROR] {entry['input']}: {entry['error']}")
+    
+    # 报告按输入顺序排列, 与完成顺序无关
+    order = {item[0]: index for index, item in enumerate(inputs)}
+    results.sort(key=lambda entry: order[entry['input']])
+    elapsed = time.perf_counter() - start_time
+    failed = sum(1 for entry in results if not entry['success'])
+    print(f"打包完成: 成功 {len(results) - failed}, 失败 {failed} (共 {len(results)} 个文件, 用时 {elapsed:.1f}s)")
+    
+    if report_file:
+        write_report(report_file, converter, results, elapsed, jobs)
+    return results
+
+def compare_modes(converter, input_file, output_dir=None, exe_name=None, report_file=None):
+    """按每种打包方式各构建一次 (输出到 output_dir/<方式>/), 比较产物大小和启动耗时"""
+    output_dir = output_dir or os.path.dirname(input_file) or '.'
+    results = []
+    measurements = {}
+    for mode in BUILD_MODES:
+        converter.mode = mode
+        timings = {}
+        success, result = converter.convert_file(input_file, os.path.join(output_dir, mode), exe_name, timings)
+        results.append(_result_entry(input_file, success, result, timings))
+        if not success:
+            print(f"[ERROR] {mode} 打包失败: {result}")
+            return 1
+        measurements[mode] = measure_artifact(result)
+    
+    print(f"{'方式':<8} {'大小':>10} {'冷启动':>8} {'热启动':>8}")
+    for mode, measurement in measurements.items():
+        note = '' if measurement['returncode'] == 0 else f"  (退出码 {measurement['returncode']})"
+        print(f"{mode:<8} {measurement['size'] / 1e6:>8.1f}MB {measurement['cold_start']:>7.2f}s "
+              f"{measurement['warm_start']:>7.2f}s{note}")
+    if report_file:
+        write_report(report_file, converter, results, sum(entry['seconds'] for entry in results),
+                     extra={'modes': measurements})
+    return 0
 
 def main():
     parser = argparse.ArgumentParser(description='将 .code 文件转换为 .exe 文件')
-    parser.add_argument('input', help='输入文件或目录')
+    parser.add_argument('input', help='输入文件、目录或通配符 (如 "tools/*.code")')
     parser.add_argument('-o', '--output', help='输出目录')
-    parser.add_argument('-n', '--name', help='exe 文件名（不含扩展名）')
+    parser.add_argument('-n', '--name', help='exe 文件名（不含扩展名, 仅用于单个文件）')
+    parser.add_argument('-r', '--recursive', action='store_true', help='目录输入时递归处理子目录')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='并行构建数 (0 表示 CPU 核数)')
+    parser.add_argument('--timeout', type=float, default=BUILD_TIMEOUT, help='单个构建的超时 (秒)')
+    parser.add_argument('--report', help='JSON 报告 (结果和各阶段耗时) 路径; 批量打包时默认 code_to_exe_report.json')
     parser.add_argument('--install-pyinstaller', action='store_true', 
                        help='自动安装 PyInstaller')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='不使用转换缓存和打包缓存, 总是重新转换和构建')
+    parser.add_argument('--clean', action='store_true',
+                       help='清除 PyInstaller 的缓存后完整重新分析 (默认复用上次构建的分析结果)')
+    parser.add_argument('--mode', choices=BUILD_MODES, default='onefile',
+                       help='onefile: 单个文件 (默认); onedir: 目录, 启动时不必解压, 更快; '
+                            'pyz: 不用 PyInstaller, 打包为需要已安装 Python 的 .pyz')
+    parser.add_argument('--compress', action='store_true', help='pyz 模式下压缩归档')
+    parser.add_argument('--compare-modes', action='store_true',
+                       help='按每种方式分别打包单个文件, 报告产物大小和启动耗时')
     
     args = parser.parse_args()
     
-    converter = StandaloneCodeToEXEConverter()
+    if args.no_cache:
+        os.environ[code_to_py.CACHE_DIR_VAR] = ''
+    
+    inputs = collect_inputs(args.input, args.recursive)
+    if not inputs:
+        print(f"错误: 没有找到 .code 文件: {args.input}")
+        return 1
+    batch = not os.path.isfile(args.input)
+    
+    converter = StandaloneCodeToEXEConverter(clean=args.clean, timeout=args.timeout, verbose=not batch,
+                                             mode=args.mode, compress=args.compress)
     
-    # 检查依赖
-    if not converter.check_pyinstaller():
+    # 检查依赖; pyz 只需要标准库
+    if (args.mode != 'pyz' or args.compare_modes) and not converter.check_pyinstaller():
         print("PyInstaller 未安装")
         if args.install_pyinstaller:
             if converter.install_pyinstaller():
@@ -601,12 +841,25 @@ def main():
     
     print("依赖检查通过")
     
+    if batch:
+        results = convert_batch(converter, inputs, args.output, args.jobs,
+                                args.report or 'code_to_exe_report.json')
+        return 0 if all(entry['success'] for entry in results) else 1
+    
     if os.path.isfile(args.input):
         if not args.input.endswith('.code'):
             print(f"错误: 输入文件必须是 .code 文件: {args.input}")
             return 1
         
-        success, result = converter.convert_file(args.input, args.output, args.name)
+        if args.compare_modes:
+            return compare_modes(converter, args.input, args.output, args.name, args.report)
+        
+        timings = {}
+        success, result = converter.convert_file(args.input, args.output, args.name, timings)
+        print(f"耗时: {format_timings(timings)}")
+        if args.report:
+            write_report(args.report, converter, [_result_entry(args.input, success, result, timings)],
+                         timings.get('total', 0))
         if success:
             print(f"[SUCCESS] 转换成功: {result}")
             return 0